@@ -0,0 +1,300 @@
+# benchmark.py
+"""
+性能基准脚本（全部在本地运行，不访问风云卫星网站）
+用法：
+    python benchmark.py http-session [--requests 50] [--size 65536]
+    python benchmark.py write [--size-mb 256]
+    python benchmark.py captcha [--corpus captcha_corpus]
+    python benchmark.py importtime [--modules download submit_order combined_worker] [--top 10] [--max-ms 0]
+"""
+import argparse
+import os
+import shutil
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def _make_self_signed_cert(work_dir):
+    """用openssl生成本地HTTPS测试用的自签名证书，返回(证书路径, 私钥路径)"""
+    cert_path = os.path.join(work_dir, 'cert.pem')
+    key_path = os.path.join(work_dir, 'key.pem')
+    subprocess.run(
+        ['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+         '-subj', '/CN=localhost', '-keyout', key_path, '-out', cert_path],
+        check=True, capture_output=True
+    )
+    return cert_path, key_path
+
+
+class _LocalHTTPSServer:
+    """本地HTTPS替身服务器：返回固定大小的数据，并统计建立的连接数（即TLS握手次数）"""
+    def __init__(self, payload_size, cert_path, key_path):
+        payload = os.urandom(payload_size)
+        counter = {'connections': 0}
+        lock = threading.Lock()
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'  # 支持keep-alive
+
+            def setup(self):
+                with lock:
+                    counter['connections'] += 1
+                super().setup()
+
+            def do_GET(self):
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.counter = counter
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(cert_path, key_path)
+        self.server.socket = context.wrap_socket(self.server.socket, server_side=True)
+        self.url = f'https://127.0.0.1:{self.server.server_address[1]}/FY3D_TEST.HDF'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def bench_http_session(args):
+    """对比每个文件新建会话（旧行为）与共享连接池会话的耗时和握手次数"""
+    import requests
+    import urllib3
+    from download_http_file import DEFAULT_HEADERS, create_http_session
+    urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+
+    work_dir = tempfile.mkdtemp(prefix='fy_bench_')
+    try:
+        cert_path, key_path = _make_self_signed_cert(work_dir)
+        with _LocalHTTPSServer(args.size, cert_path, key_path) as server:
+            def fetch(session):
+                with session.get(server.url, stream=True, verify=False, timeout=30) as response:
+                    for _ in response.iter_content(chunk_size=8192):
+                        pass
+
+            # 旧行为：每个文件新建一个Session
+            server.counter['connections'] = 0
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                session = requests.Session()
+                session.headers.update(DEFAULT_HEADERS)
+                fetch(session)
+                session.close()
+            fresh_time = time.perf_counter() - start
+            fresh_connections = server.counter['connections']
+
+            # 新行为：所有文件共用一个会话
+            server.counter['connections'] = 0
+            session = create_http_session(pool_size=4)
+            start = time.perf_counter()
+            for _ in range(args.requests):
+                fetch(session)
+            shared_time = time.perf_counter() - start
+            shared_connections = server.counter['connections']
+            session.close()
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"请求数: {args.requests}，每个响应 {args.size} 字节")
+    print(f"每次新建会话: {fresh_time:.3f}秒，{fresh_connections}次TLS握手，"
+          f"平均 {fresh_time / args.requests * 1000:.1f}毫秒/请求")
+    print(f"共享会话:     {shared_time:.3f}秒，{shared_connections}次TLS握手，"
+          f"平均 {shared_time / args.requests * 1000:.1f}毫秒/请求")
+    if shared_time > 0:
+        print(f"加速比: {fresh_time / shared_time:.2f}x")
+
+
+def bench_write(args):
+    """对比旧写入方式（8KB块、每块计算并打印进度）与ChunkWriter的写入速度（MB/s）"""
+    from file_writer import ChunkWriter, ProgressReporter, DEFAULT_CHUNK_SIZE
+
+    total = args.size_mb * 1024 * 1024
+    work_dir = tempfile.mkdtemp(prefix='fy_bench_')
+    devnull = open(os.devnull, 'w')  # 进度输出到空设备，只计入打印本身的开销
+    try:
+        # 旧写入方式：与原download_ftp_with_progress的回调相同
+        old_chunk = os.urandom(8192)
+        path = os.path.join(work_dir, 'old.HDF')
+        start = time.perf_counter()
+        with open(path, 'wb') as file:
+            downloaded = 0
+            for _ in range(total // len(old_chunk)):
+                file.write(old_chunk)
+                downloaded += len(old_chunk)
+                progress = (downloaded / total) * 100
+                print(f"\r下载进度: old.HDF {progress:.2f}%", end='', flush=True, file=devnull)
+        old_time = time.perf_counter() - start
+
+        # 新写入方式：大块读取、缓冲写入、预分配、限频进度、原子重命名
+        new_chunk = os.urandom(DEFAULT_CHUNK_SIZE)
+        path = os.path.join(work_dir, 'new.HDF')
+
+        def report(label, done, size):
+            print(f"\r下载进度: {label} {done / size * 100:.2f}%", end='', flush=True, file=devnull)
+
+        start = time.perf_counter()
+        progress = ProgressReporter('new.HDF', total, callback=report, max_per_second=2)
+        with ChunkWriter(path, total, progress=progress) as writer:
+            for _ in range(total // len(new_chunk)):
+                writer.write(new_chunk)
+            writer.commit()
+        new_time = time.perf_counter() - start
+    finally:
+        devnull.close()
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    print(f"写入 {args.size_mb} MB")
+    print(f"旧写入方式: {old_time:.3f}秒，{args.size_mb / old_time:.1f} MB/s")
+    print(f"ChunkWriter: {new_time:.3f}秒，{args.size_mb / new_time:.1f} MB/s")
+
+
+def bench_captcha(args):
+    """对比直接识别原图（旧行为）与CaptchaSolver（字符集/长度限制、预处理、置信度拒绝）的准确率和耗时"""
+    import ddddocr
+    from captcha_solver import CaptchaSolver, load_corpus
+    from config_handler import ConfigHandler
+
+    settings = ConfigHandler().get_captcha_settings()
+    corpus_dir = args.corpus or settings['corpus_dir']
+    samples = load_corpus(corpus_dir) if corpus_dir else []
+    if not samples:
+        # 不用生成的验证码代替：它们与门户的验证码差别很大，准确率没有参考价值
+        print(f"语料目录 {corpus_dir or '(未配置)'} 没有已标注样本。登录时会自动收集样本"
+              f"（配置 [CAPTCHA] corpus_dir），也可以把门户验证码保存为 <验证码>_<编号>.png 后再运行")
+        sys.exit(1)
+    images = []
+    for path, label in samples:
+        with open(path, 'rb') as f:
+            images.append((f.read(), label))
+
+    # 旧行为：原图直接识别，不限制字符集（单独的模型实例，不受set_ranges影响）
+    raw_ocr = ddddocr.DdddOcr()
+    raw_correct, raw_times = 0, []
+    for png_data, label in images:
+        start = time.perf_counter()
+        text = raw_ocr.classification(png_data)
+        raw_times.append(time.perf_counter() - start)
+        raw_correct += text == label
+
+    settings['corpus_dir'] = ''  # 评估时不收集样本
+    solver = CaptchaSolver(**settings)
+    correct = accepted = accepted_correct = 0
+    times = []
+    for png_data, label in images:
+        result = solver.solve(png_data)
+        times.append(result.seconds)
+        correct += result.text == label
+        if result.accepted:
+            accepted += 1
+            accepted_correct += result.text == label
+
+    def latency(values):
+        values = sorted(values)
+        return f"平均 {sum(values) / len(values) * 1000:.1f} 毫秒，p95 {values[int(len(values) * 0.95) - 1] * 1000:.1f} 毫秒"
+
+    total = len(images)
+    print(f"样本数: {total}")
+    print(f"直接识别原图:  准确率 {raw_correct / total:.1%}，{latency(raw_times)}")
+    print(f"CaptchaSolver: 准确率 {correct / total:.1%}，{latency(times)}")
+    print(f"    置信度≥{solver.min_confidence} 的结果 {accepted} 个（{accepted / total:.1%}），"
+          f"其中正确 {accepted_correct / accepted if accepted else 0:.1%}；其余会先刷新验证码再提交")
+
+
+def _import_time(module):
+    """
+    在新的Python进程中用 -X importtime 导入模块
+    Returns:
+    (总耗时毫秒, [(累计耗时毫秒, 模块名), ...])
+    """
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"导入{module}失败:\n{result.stderr[-2000:]}")
+    entries = []
+    for line in result.stderr.splitlines():
+        # 格式：import time:   self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        name = parts[2].rstrip()
+        entries.append((int(parts[1]) / 1000, name.strip(), len(name) - len(name.lstrip())))
+    # 子模块的行在父模块之前输出、缩进多一级；从模块所在行往前找它直接导入的模块
+    index = next((i for i in range(len(entries) - 1, -1, -1) if entries[i][1] == module), None)
+    if index is None:
+        return 0.0, []
+    total, _, module_indent = entries[index]
+    children = []
+    for ms, name, indent in reversed(entries[:index]):
+        if indent <= module_indent:
+            break
+        if indent == module_indent + 2:
+            children.append((ms, name))
+    return total, sorted(children, reverse=True)
+
+
+def bench_importtime(args):
+    """统计各入口模块的导入耗时和最重的依赖；--max-ms 大于0时超过阈值返回非0（用于检查回归）"""
+    failed = False
+    for module in args.modules:
+        total, heaviest = _import_time(module)
+        print(f"{module}: 导入共 {total:.1f} 毫秒")
+        for ms, name in heaviest[:args.top]:
+            print(f"    {ms:8.1f} 毫秒  {name}")
+        if args.max_ms and total > args.max_ms:
+            print(f"    超过阈值 {args.max_ms} 毫秒")
+            failed = True
+    if failed:
+        sys.exit(1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='FY_Crawler 性能基准')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('http-session', help='对比每次新建会话与共享会话的HTTPS请求耗时')
+    p.add_argument('--requests', type=int, default=50, help='请求次数')
+    p.add_argument('--size', type=int, default=64 * 1024, help='每个响应的字节数')
+    p.set_defaults(func=bench_http_session)
+
+    p = subparsers.add_parser('write', help='对比旧写入循环与ChunkWriter的写入速度')
+    p.add_argument('--size-mb', type=int, default=256, help='写入的数据量（MB）')
+    p.set_defaults(func=bench_write)
+
+    p = subparsers.add_parser('captcha', help='验证码识别准确率和耗时（需要已标注的验证码样本）')
+    p.add_argument('--corpus', default='', help='已标注样本目录（文件名为 <验证码>_*.png，默认使用配置的语料目录）')
+    p.set_defaults(func=bench_captcha)
+
+    p = subparsers.add_parser('importtime', help='统计入口模块的导入耗时（python -X importtime）')
+    p.add_argument('--modules', nargs='+', default=['download', 'submit_order', 'combined_worker'],
+                   help='要统计的模块')
+    p.add_argument('--top', type=int, default=10, help='列出最重的前N个导入')
+    p.add_argument('--max-ms', type=float, default=0, help='导入耗时阈值（毫秒），超过时返回非0；0表示不检查')
+    p.set_defaults(func=bench_importtime)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+# browser_profile.py
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# ChromeDriverManager解析出的驱动路径缓存（每次install()都会联网检查版本）
+DRIVER_PATH_CACHE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.chromedriver_path')
+DRIVER_CACHE_MAX_AGE = 7 * 24 * 3600  # 缓存有效期（秒），过期后重新检查驱动版本
+
+# 默认屏蔽的资源（Network.setBlockedURLs 通配符）：图片、字体、音视频
+# 验证码图片由动态接口生成（地址不以图片扩展名结尾），不会被这些规则屏蔽；
+# 如门户改成静态图片地址，可在配置 blocked_url_patterns 中调整
+DEFAULT_BLOCKED_PATTERNS = [
+    '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.bmp', '*.ico', '*.svg',
+    '*.woff', '*.woff2', '*.ttf', '*.otf', '*.eot',
+    '*.mp4', '*.webm', '*.mp3', '*.ogg',
+]
+
+
+def build_chrome_options(config, prefs=None):
+    """
+    按配置生成Chrome启动选项
+    Args:
+    config: ConfigHandler
+    prefs: 额外的Chrome偏好设置（如下载设置）
+    """
+    from selenium.webdriver.chrome.options import Options  # selenium较重，启动浏览器时才导入
+    chrome_options = Options()
+    chrome_options.page_load_strategy = 'eager'  # 页面加载策略设置为"急切"模式
+    chrome_options.add_argument('--disable-background-timer-throttling')  # 禁用后台标签页的定时器节流
+    chrome_options.add_argument('--disable-renderer-backgrounding')  # 禁用渲染进程的后台降级
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--window-size=1920,1080')  # 无头模式也保持同样的布局，XPath定位不受影响
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--ignore-certificate-errors')
+    chrome_options.add_argument('--disable-extensions')
+
+    if config.get_headless():
+        chrome_options.add_argument('--headless=new')  # 新版无头模式，行为与有界面的Chrome一致
+
+    user_data_dir = config.get_user_data_dir()
+    if user_data_dir:
+        # 固定的用户目录：HTTP缓存在多次运行之间复用
+        # 该目录同时只能被一个Chrome使用，submit_order 和 download 同时运行时不能共用
+        os.makedirs(user_data_dir, exist_ok=True)
+        chrome_options.add_argument(f'--user-data-dir={user_data_dir}')
+
+    if prefs:
+        chrome_options.add_experimental_option('prefs', prefs)
+
+    if config.get_keep_browser_open():
+        # 保持浏览器打开状态（调试用），程序结束时不会退出浏览器
+        chrome_options.add_experimental_option('detach', True)
+    return chrome_options
+
+
+def resolve_driver_path(config):
+    """
+    chromedriver路径：配置文件 > 本地缓存 > ChromeDriverManager（联网检查并下载，结果写入缓存）
+    Returns:
+    (驱动路径, 是否来自缓存)
+    """
+    driver_path = config.get_chrome_driver_path()
+    if driver_path and os.path.exists(driver_path):
+        return driver_path, False
+
+    if os.path.exists(DRIVER_PATH_CACHE) and time.time() - os.path.getmtime(DRIVER_PATH_CACHE) < DRIVER_CACHE_MAX_AGE:
+        with open(DRIVER_PATH_CACHE, encoding='utf-8') as f:
+            cached_path = f.read().strip()
+        if cached_path and os.path.exists(cached_path):
+            return cached_path, True
+
+    # 自动下载并使用合适版本的chromedriver
+    from webdriver_manager.chrome import ChromeDriverManager
+    driver_path = ChromeDriverManager().install()
+    logger.info("使用自动管理的ChromeDriver")
+    try:
+        with open(DRIVER_PATH_CACHE, 'w', encoding='utf-8') as f:
+            f.write(driver_path)
+    except OSError as e:
+        logger.warning(f"缓存驱动路径失败: {str(e)}")
+    return driver_path, False
+
+
+def forget_driver_path():
+    """删除驱动路径缓存（Chrome升级后缓存的驱动可能不再匹配）"""
+    if os.path.exists(DRIVER_PATH_CACHE):
+        os.remove(DRIVER_PATH_CACHE)
+
+
+def launch_chrome(config, prefs=None):
+    """按配置启动Chrome并返回driver；缓存的驱动启动失败时清除缓存并重新获取一次"""
+    from selenium import webdriver
+    from selenium.webdriver.chrome.service import Service
+
+    driver_path, from_cache = resolve_driver_path(config)
+    try:
+        return webdriver.Chrome(service=Service(driver_path), options=build_chrome_options(config, prefs))
+    except Exception as e:
+        if not from_cache:
+            raise
+        logger.warning(f"缓存的ChromeDriver启动失败（{str(e)}），重新获取驱动")
+        forget_driver_path()
+        driver_path, _ = resolve_driver_path(config)
+        return webdriver.Chrome(service=Service(driver_path), options=build_chrome_options(config, prefs))
+
+
+def apply_network_profile(driver, config, download_dir=None):
+    """
+    浏览器启动后通过CDP设置：屏蔽图片/字体/音视频资源，无头模式下允许下载到download_dir
+    设置失败只记录警告，不影响后续流程
+    """
+    if config.get_block_resources():
+        patterns = config.get_blocked_url_patterns() or DEFAULT_BLOCKED_PATTERNS
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            logger.info(f"已屏蔽{len(patterns)}类资源请求（图片、字体、音视频）")
+        except Exception as e:
+            logger.warning(f"屏蔽资源请求失败: {str(e)}")
+
+    if download_dir and config.get_headless():
+        try:
+            driver.execute_cdp_cmd('Browser.setDownloadBehavior',
+                                   {'behavior': 'allow', 'downloadPath': os.path.abspath(download_dir)})
+        except Exception as e:
+            logger.warning(f"设置无头模式下载目录失败: {str(e)}")
+
+
+def quit_driver(driver, config):
+    """结束浏览器进程（配置了keep_browser_open时保留浏览器）"""
+    if driver is None:
+        return
+    if config.get_keep_browser_open():
+        logger.info("按配置保留浏览器窗口")
+        return
+    try:
+        driver.quit()
+        logger.info("浏览器已关闭")
+    except Exception as e:
+        logger.warning(f"关闭浏览器失败: {str(e)}")
@@ -0,0 +1,196 @@
+# captcha_solver.py
+import io
+import logging
+import os
+import re
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# 门户验证码：4位小写字母和数字
+DEFAULT_CHARSET = '0123456789abcdefghijklmnopqrstuvwxyz'
+DEFAULT_LENGTH = 4
+MAX_CORPUS_FILES = 2000  # 语料目录最多保存的图片数，超过后不再收集
+
+# 进程内共用的验证码识别模型（ddddocr导入onnxruntime并加载模型需要较长时间）
+_ocr = None
+_ocr_lock = threading.Lock()
+
+
+def get_ocr():
+    """返回共用的ddddocr模型，第一次调用时才导入ddddocr并加载模型"""
+    global _ocr
+    with _ocr_lock:
+        if _ocr is None:
+            start = time.perf_counter()
+            import ddddocr
+            _ocr = ddddocr.DdddOcr()
+            logger.info(f"验证码模型加载完成（{time.perf_counter() - start:.2f}秒）")
+        return _ocr
+
+
+def preprocess(png_data):
+    """
+    验证码图片预处理：灰度 → 拉伸对比度 → 二值化（Otsu阈值） → 中值滤波去除噪点
+    返回处理后的PNG字节
+    """
+    from PIL import Image, ImageFilter, ImageOps  # 只有识别验证码时用到
+
+    image = ImageOps.autocontrast(Image.open(io.BytesIO(png_data)).convert('L'))
+    threshold = _otsu_threshold(image.histogram())
+    image = image.point(lambda value: 255 if value > threshold else 0)
+    image = image.filter(ImageFilter.MedianFilter(3))
+    output = io.BytesIO()
+    image.save(output, format='PNG')
+    return output.getvalue()
+
+
+def _otsu_threshold(histogram):
+    """按灰度直方图计算使类间方差最大的阈值"""
+    total = sum(histogram)
+    weighted_total = sum(value * count for value, count in enumerate(histogram))
+    background = background_sum = 0
+    best_threshold, best_variance = 127, 0.0
+    for value, count in enumerate(histogram):
+        background += count
+        if background == 0:
+            continue
+        foreground = total - background
+        if foreground == 0:
+            break
+        background_sum += value * count
+        mean_background = background_sum / background
+        mean_foreground = (weighted_total - background_sum) / foreground
+        variance = background * foreground * (mean_background - mean_foreground) ** 2
+        if variance > best_variance:
+            best_threshold, best_variance = value, variance
+    return best_threshold
+
+
+class CaptchaResult:
+    """一次识别的结果：accepted为False时应刷新验证码，而不是提交可能错误的结果"""
+    __slots__ = ('text', 'confidence', 'accepted', 'source', 'seconds')
+
+    def __init__(self, text, confidence, accepted, source, seconds=0.0):
+        self.text = text
+        self.confidence = confidence
+        self.accepted = accepted
+        self.source = source  # 'raw' 原图 / 'preprocessed' 预处理后的图片
+        self.seconds = seconds
+
+    def __repr__(self):
+        return (f"CaptchaResult(text={self.text!r}, confidence={self.confidence:.3f}, "
+                f"accepted={self.accepted}, source={self.source!r})")
+
+
+class CaptchaSolver:
+    """
+    验证码识别：限制字符集和长度，先识别原图，结果不可信时再识别预处理后的图片，
+    两次都达不到置信度阈值时拒绝（由调用方刷新验证码）
+    识别结果经登录验证后保存到语料目录，供 benchmark.py captcha 离线评估准确率
+    """
+    def __init__(self, charset=DEFAULT_CHARSET, length=DEFAULT_LENGTH, min_confidence=0.6,
+                 use_preprocess=True, corpus_dir='', ocr=None):
+        """
+        Args:
+        charset: 允许的字符（识别结果中的大写字母转成小写，其他字符去掉）
+        length: 验证码长度（0表示不限制）
+        min_confidence: 低于这个置信度的结果视为不可信
+        use_preprocess: 原图结果不可信时是否再识别预处理后的图片
+        corpus_dir: 保存验证码样本的目录（空字符串表示不保存）
+        ocr: ddddocr模型，默认使用进程内共用的模型
+        """
+        self.charset = charset
+        self.length = length
+        self.min_confidence = min_confidence
+        self.use_preprocess = use_preprocess
+        self.corpus_dir = corpus_dir
+        self._ocr = ocr
+        self._ranges_set = False
+        self._pattern = re.compile(f"[^{re.escape(charset)}]")
+
+    @classmethod
+    def from_config(cls, config, ocr=None):
+        return cls(ocr=ocr, **config.get_captcha_settings())
+
+    @property
+    def ocr(self):
+        if self._ocr is None:
+            self._ocr = get_ocr()
+        if not self._ranges_set:
+            self._ranges_set = True
+            try:
+                self._ocr.set_ranges(self.charset)  # 只在允许的字符中解码
+            except Exception as e:
+                logger.debug(f"当前ddddocr不支持限制字符集，只过滤识别结果: {str(e)}")
+        return self._ocr
+
+    def _classify(self, png_data, source):
+        """识别一张图片，返回CaptchaResult（置信度取模型给出的概率，没有时按1计）"""
+        result = self.ocr.classification(png_data, probability=True)
+        text, confidence = _decode(result)
+        text = self._pattern.sub('', text.lower())
+        accepted = confidence >= self.min_confidence and (not self.length or len(text) == self.length)
+        return CaptchaResult(text, confidence, accepted, source)
+
+    def solve(self, png_data):
+        """识别验证码，返回CaptchaResult"""
+        start = time.perf_counter()
+        result = self._classify(png_data, 'raw')
+        if not result.accepted and self.use_preprocess:
+            candidate = self._classify(preprocess(png_data), 'preprocessed')
+            if candidate.accepted or candidate.confidence > result.confidence:
+                result = candidate
+        result.seconds = time.perf_counter() - start
+        return result
+
+    def record(self, png_data, text, correct):
+        """
+        保存验证码样本：登录成功的保存为 <验证码>_<时间>.png（已标注），
+        验证码错误的保存到 unverified 目录（人工改名标注后移到语料目录即可使用）
+        """
+        if not self.corpus_dir or not png_data:
+            return
+        target_dir = self.corpus_dir if correct else os.path.join(self.corpus_dir, 'unverified')
+        try:
+            os.makedirs(target_dir, exist_ok=True)
+            if len(os.listdir(target_dir)) >= MAX_CORPUS_FILES:
+                return
+            name = f"{text or 'unknown'}_{time.strftime('%Y%m%d%H%M%S')}_{int(time.time() * 1000) % 1000:03d}.png"
+            with open(os.path.join(target_dir, name), 'wb') as f:
+                f.write(png_data)
+        except OSError as e:
+            logger.warning(f"保存验证码样本失败: {str(e)}")
+
+
+def _decode(result):
+    """
+    兼容不同版本ddddocr的 probability=True 返回值，返回 (文本, 置信度)
+    新版本：{'text', 'confidence', ...}；旧版本：{'charsets', 'probability'}（逐帧概率，需要自己解码）
+    """
+    if isinstance(result, str):
+        return result, 1.0
+    if 'text' in result:
+        return result['text'], float(result.get('confidence', 1.0))
+    charsets, frames = result['charsets'], result['probability']
+    chars, scores, previous = [], [], 0
+    for frame in frames:
+        index = max(range(len(frame)), key=frame.__getitem__)
+        if index != previous and index != 0:  # 0为CTC空白，连续相同的帧只取一次
+            chars.append(charsets[index])
+            scores.append(frame[index])
+        previous = index
+    confidence = sum(scores) / len(scores) if scores else 0.0
+    return ''.join(chars), float(confidence)
+
+
+def load_corpus(corpus_dir):
+    """读取已标注的样本：文件名第一个下划线前的部分为验证码，返回 [(路径, 验证码), ...]"""
+    samples = []
+    if not os.path.isdir(corpus_dir):
+        return samples
+    for name in sorted(os.listdir(corpus_dir)):
+        if name.lower().endswith(('.png', '.jpg', '.jpeg', '.gif')) and '_' in name:
+            samples.append((os.path.join(corpus_dir, name), name.split('_', 1)[0].lower()))
+    return samples
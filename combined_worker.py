@@ -0,0 +1,84 @@
+# combined_worker.py
+"""
+合并模式：一个进程、一个浏览器、一次登录，依次完成
+    提交订单 → 等待订单处理完成 → 下载
+与分别运行 submit_order.py 和 download.py 相比，库导入、验证码模型加载、浏览器启动和登录都只做一次
+用法：
+    python combined_worker.py
+    任一阶段失败时退出码为1（schedule_runner 据此记录运行失败）
+"""
+import logging
+import os
+import sys
+import traceback
+
+from config_handler import ConfigHandler
+import submit_order
+import download
+
+# 两个模块导入时各自配置了日志文件，这里统一改为合并模式的日志文件
+log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "combined_worker.log")
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(levelname)s - %(message)s',
+    handlers=[
+        logging.FileHandler(log_file, encoding='utf-8', mode='a'),
+        logging.StreamHandler()
+    ],
+    force=True
+)
+logger = logging.getLogger(__name__)
+
+
+class CombinedWorker:
+    def __init__(self, config=None):
+        self.config = config or ConfigHandler()
+        # 下载流程的浏览器带有下载目录设置，由它启动Chrome；提交订单流程复用同一个浏览器
+        # 验证码模型在进程内共用（captcha_solver.get_ocr），只加载一次
+        self.download_browser = download.SatelliteBrowser(self.config)
+        self.order_browser = submit_order.SatelliteBrowser(self.config)
+        self.orderer = submit_order.SatelliteDataDownloader(self.config, browser=self.order_browser)
+        self.downloader = download.SatelliteDataDownloader(self.config, browser=self.download_browser)
+
+    def run(self):
+        """运行全部阶段，返回是否完成"""
+        try:
+            if not self.download_browser.init_browser():
+                logger.error("无法初始化浏览器，程序退出")
+                return False
+            self.order_browser.attach(self.download_browser)
+
+            logger.info("===== 阶段1：提交订单 =====")
+            if not self.orderer.run():
+                logger.error("提交订单失败，不再等待和下载")
+                return False
+
+            logger.info("===== 阶段2：等待订单处理完成 =====")
+            timeout, interval = self.config.get_order_ready_wait()
+            if not self.downloader.wait_for_order_ready(timeout, interval):
+                return False
+
+            logger.info("===== 阶段3：下载 =====")
+            if not self.downloader.run():
+                logger.error("下载阶段失败")
+                return False
+            return True
+        except Exception as e:
+            logger.error(f"合并模式运行出错: {str(e)}")
+            logger.error(traceback.format_exc())
+            return False
+        finally:
+            self.download_browser.close()
+
+
+def main():
+    """运行合并模式，返回进程退出码（任一阶段失败时为1）"""
+    logger.info("===== 合并模式启动 =====")
+    success = CombinedWorker().run()
+    logger.info(f"===== 合并模式结束（{'完成' if success else '失败'}） =====")
+    return 0 if success else 1
+
+
+# 主程序入口
+if __name__ == "__main__":
+    sys.exit(main())
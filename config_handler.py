@@ -1,5 +1,6 @@
 # config_handler.py
 import os
+import re
 import configparser
 import logging
 
@@ -27,7 +28,68 @@ class ConfigHandler:
             'timeout': '10',                      # 超时时间（秒）
             'retry_attempts': '3',                # 最大重试次数
             'chrome_driver_path': '',             # Chrome驱动路径（留空自动管理）
-            'download_dir': os.path.expanduser("~/Downloads")  # 下载文件保存目录
+            'download_dir': os.path.expanduser("~/Downloads"),  # 下载文件保存目录
+            'max_workers': '4',                   # 并行下载的文件数
+            'http_segments': '4',                 # 单个HTTP大文件的分段连接数（1为不分段）
+            'ftp_max_connections': '4',           # 每个FTP主机最多同时保持的连接数
+            'checksum_algorithm': 'md5',          # 下载时计算的校验算法（md5/sha256/xxh64，留空不计算）
+            'chunk_size': '65536',                # 每次从网络读取的字节数
+            'write_block_size': '1048576',        # 写入磁盘的块大小（字节）
+            'progress_rate': '2',                 # 每个文件每秒最多输出几行下载进度（0不输出）
+            'enable_trace': 'True',               # 是否记录浏览器流程各步骤耗时（traces目录，Chrome trace格式）
+            'wait_poll_interval': '0.1',          # 等待页面状态时的轮询间隔（秒）
+            'headless': 'False',                  # 无头模式运行浏览器（True启用，定时运行时可减少内存占用）
+            'block_resources': 'False',           # 屏蔽图片、字体、音视频（验证码除外，True启用）
+            'blocked_url_patterns': '',           # 屏蔽的资源地址通配符，逗号分隔（留空使用默认列表）
+            'user_data_dir': '',                  # Chrome用户目录（相对程序目录，留空不使用固定目录；同一目录只能被一个浏览器使用）
+            'keep_browser_open': 'False',         # 程序结束后保留浏览器（调试用）
+            'session_file': 'session.bin',        # 加密保存的登录会话（相对程序目录，留空不保存）
+            'session_max_age_hours': '12',        # 超过这个时间的会话不再尝试恢复（小时）
+            'order_ready_timeout': '3600',        # 合并模式下提交订单后最长等待订单处理完成的时间（秒）
+            'order_ready_interval': '60',         # 合并模式下刷新订单列表的间隔（秒）
+            'harvest_orders': 'False',            # True时处理"我的订单"中所有未处理的已完成订单（默认只处理第一行）
+            'order_index_file': 'processed_orders.sqlite',  # 已处理订单索引（相对程序目录）
+            'catalog_file': 'granule_catalog.sqlite',  # 已下载文件目录（相对程序目录，留空不记录）
+            'storage_layout': ''                  # 下载文件的子目录规则，如 {satellite}/{product}/{YYYY}/{MM}/{DD}（留空不分层）
+        }
+        self.config['PORTAL'] = {
+            'portal_client': 'True',              # 有保存的登录会话时先不启动浏览器，直接用HTTP读取订单
+            'order_list_url': '',                 # "我的订单"列表地址（返回含displayOrderBody的HTML，留空不使用HTTP模式）
+            'link_file_url': ''                   # 文件按钮没有直接链接时的地址模板，用{order_id}表示订单号
+        }
+        self.config['ROI'] = {
+            'north': '60',                        # 提交订单时的空间范围（十进制度数，按门户输入框的含义填写）
+            'south': '90',
+            'west': '-180',
+            'east': '180'
+        }
+        self.config['PIPELINE'] = {
+            'post_processor': '',                 # 下载后的处理函数，"模块:函数"（留空不处理），如 roi_subset:process_granule
+            'process_workers': '2',               # 后处理进程数
+            'queue_size': '8',                    # 等待校验的文件数和同时处理的景数上限
+            'pair_products': '1000M,GEO1K',       # 同一景需要一起处理的产品（都下载完成后才处理）
+            'state_file': 'processed_scenes.sqlite'  # 已处理景的记录（相对程序目录，留空则每次都处理）
+        }
+        self.config['SUBSET'] = {
+            'lat_min': '60',                      # 裁剪范围（十进制度数）；经度下限大于上限表示跨越180°经线
+            'lat_max': '90',
+            'lon_min': '-180',
+            'lon_max': '180',
+            'datasets': 'Data/EV_1KM_RefSB, Data/EV_1KM_Emissive, Data/EV_250_Aggr.1KM_RefSB, Data/EV_250_Aggr.1KM_Emissive',  # 保留的数据集，可写成 路径[波段序号]
+            'lat_dataset': 'Geolocation/Latitude',  # GEO1K文件中的纬度数据集
+            'lon_dataset': 'Geolocation/Longitude',  # GEO1K文件中的经度数据集
+            'output_dir': 'ROI',                  # 裁剪结果目录（相对下载目录，留空与原文件放在一起）
+            'chunk_rows': '256',                  # 每次读取的行数（决定内存占用）
+            'compression_level': '4',             # gzip压缩级别（1-9）
+            'delete_source': 'False'              # 裁剪成功后删除原始的1000M和GEO1K文件（清单中标记为已处理，不会重新下载）
+        }
+        self.config['CAPTCHA'] = {
+            'charset': '0123456789abcdefghijklmnopqrstuvwxyz',  # 验证码可能出现的字符（识别结果只保留这些字符）
+            'length': '4',                        # 验证码长度（0为不限制）
+            'min_confidence': '0.6',              # 识别置信度低于该值时先刷新验证码，不提交
+            'max_refreshes': '3',                 # 每次登录尝试中因结果不可信最多刷新验证码的次数
+            'preprocess': 'True',                 # 原图结果不可信时再识别灰度、二值化、去噪后的图片
+            'corpus_dir': 'captcha_corpus'        # 保存验证码样本的目录（相对程序目录，留空不保存）
         }
 
         # 写入默认配置到文件
@@ -58,6 +120,176 @@ class ConfigHandler:
         """获取下载目录（统一提供给所有程序使用）"""
         return self.config.get('SETTINGS', 'download_dir', fallback=os.path.expanduser("~/Downloads"))
 
+    def get_max_workers(self):
+        """获取并行下载的文件数（整数，至少为1）"""
+        return max(1, self.config.getint('SETTINGS', 'max_workers', fallback=4))
+
+    def get_http_segments(self):
+        """获取单个HTTP文件的分段下载连接数（整数，1表示不分段）"""
+        return max(1, self.config.getint('SETTINGS', 'http_segments', fallback=4))
+
+    def get_ftp_max_connections(self):
+        """获取每个FTP主机的最大连接数（整数，至少为1）"""
+        return max(1, self.config.getint('SETTINGS', 'ftp_max_connections', fallback=4))
+
+    def get_checksum_algorithm(self):
+        """获取下载时计算的校验算法（空字符串表示不计算）"""
+        return self.config.get('SETTINGS', 'checksum_algorithm', fallback='md5').strip()
+
+    def get_chunk_size(self):
+        """获取每次从网络读取的字节数"""
+        return max(1024, self.config.getint('SETTINGS', 'chunk_size', fallback=65536))
+
+    def get_write_block_size(self):
+        """获取写入磁盘的块大小（字节）"""
+        return max(4096, self.config.getint('SETTINGS', 'write_block_size', fallback=1048576))
+
+    def get_progress_rate(self):
+        """获取下载进度每秒最多刷新次数（0表示不显示进度）"""
+        return max(0, self.config.getint('SETTINGS', 'progress_rate', fallback=2))
+
+    def get_trace_enabled(self):
+        """获取是否记录浏览器流程时间线（布尔值）"""
+        return self.config.getboolean('SETTINGS', 'enable_trace', fallback=True)
+
+    def get_wait_poll_interval(self):
+        """获取等待页面状态时的轮询间隔（秒，浮点数）"""
+        return max(0.02, self.config.getfloat('SETTINGS', 'wait_poll_interval', fallback=0.1))
+
+    def get_headless(self):
+        """获取是否以无头模式运行浏览器（布尔值）"""
+        return self.config.getboolean('SETTINGS', 'headless', fallback=False)
+
+    def get_block_resources(self):
+        """获取是否屏蔽图片、字体、音视频资源（布尔值）"""
+        return self.config.getboolean('SETTINGS', 'block_resources', fallback=False)
+
+    def get_blocked_url_patterns(self):
+        """获取屏蔽的资源地址通配符列表（空列表表示使用默认列表）"""
+        value = self.config.get('SETTINGS', 'blocked_url_patterns', fallback='')
+        return [pattern.strip() for pattern in value.split(',') if pattern.strip()]
+
+    def get_user_data_dir(self):
+        """
+        获取Chrome用户目录的绝对路径（空字符串表示不使用固定目录）
+        同一个用户目录同时只能被一个Chrome使用：submit_order 和 download 同时运行时
+        不能配置同一个目录，否则后启动的浏览器会报 "user data directory is already in use"
+        """
+        value = self.config.get('SETTINGS', 'user_data_dir', fallback='').strip()
+        if not value:
+            return ''
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.expanduser(value))
+
+    def get_keep_browser_open(self):
+        """获取程序结束后是否保留浏览器（布尔值）"""
+        return self.config.getboolean('SETTINGS', 'keep_browser_open', fallback=False)
+
+    def get_session_file(self):
+        """获取登录会话文件的绝对路径（空字符串表示不保存会话）"""
+        value = self.config.get('SETTINGS', 'session_file', fallback='session.bin').strip()
+        if not value:
+            return ''
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.expanduser(value))
+
+    def get_session_max_age_hours(self):
+        """获取登录会话的最长保留时间（小时）"""
+        return max(0.0, self.config.getfloat('SETTINGS', 'session_max_age_hours', fallback=12))
+
+    def get_order_ready_wait(self):
+        """获取合并模式下等待订单处理完成的 (最长时间, 刷新间隔)，单位秒"""
+        return (max(0, self.config.getint('SETTINGS', 'order_ready_timeout', fallback=3600)),
+                max(5, self.config.getint('SETTINGS', 'order_ready_interval', fallback=60)))
+
+    def get_harvest_orders(self):
+        """获取是否处理所有未处理的已完成订单（布尔值）"""
+        return self.config.getboolean('SETTINGS', 'harvest_orders', fallback=False)
+
+    def get_order_index_file(self):
+        """获取已处理订单索引文件的绝对路径"""
+        value = self.config.get('SETTINGS', 'order_index_file', fallback='').strip() or 'processed_orders.sqlite'
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.expanduser(value))
+
+    def get_catalog_file(self):
+        """获取已下载文件目录的绝对路径（空字符串表示不记录）"""
+        value = self.config.get('SETTINGS', 'catalog_file', fallback='granule_catalog.sqlite').strip()
+        if not value:
+            return ''
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.expanduser(value))
+
+    def get_http_download_dir(self):
+        """获取不分层时HTTP文件的保存目录（程序目录下的FY4B_Downloads，与启动时的当前目录无关）"""
+        return os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FY4B_Downloads')
+
+    def get_storage_layout(self):
+        """获取下载文件的子目录规则（空字符串表示所有文件直接放在下载目录）"""
+        return self.config.get('SETTINGS', 'storage_layout', fallback='', raw=True).strip()
+
+    def get_portal_client_enabled(self):
+        """获取是否启用不启动浏览器的HTTP订单读取（布尔值）"""
+        return self.config.getboolean('PORTAL', 'portal_client', fallback=True)
+
+    def get_portal_endpoints(self):
+        """获取门户订单列表地址和链接文件地址模板，返回 (order_list_url, link_file_url)"""
+        return (self.config.get('PORTAL', 'order_list_url', fallback='').strip(),
+                self.config.get('PORTAL', 'link_file_url', fallback='').strip())
+
+    def get_roi(self):
+        """获取提交订单时的空间范围（十进制度数），返回 {'north', 'south', 'west', 'east'}"""
+        defaults = {'north': 60.0, 'south': 90.0, 'west': -180.0, 'east': 180.0}
+        return {key: self.config.getfloat('ROI', key, fallback=value) for key, value in defaults.items()}
+
+    def get_pipeline_settings(self):
+        """获取下载后处理流水线的设置"""
+        value = self.config.get('PIPELINE', 'pair_products', fallback='1000M,GEO1K')
+        state_file = self.config.get('PIPELINE', 'state_file', fallback='processed_scenes.sqlite').strip()
+        if state_file:
+            state_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.expanduser(state_file))
+        return {
+            'post_processor': self.config.get('PIPELINE', 'post_processor', fallback='').strip(),
+            'process_workers': max(1, self.config.getint('PIPELINE', 'process_workers', fallback=2)),
+            'queue_size': max(1, self.config.getint('PIPELINE', 'queue_size', fallback=8)),
+            'pair_products': [product.strip() for product in value.split(',') if product.strip()],
+            'state_file': state_file,
+        }
+
+    def get_subset_settings(self):
+        """获取MERSI数据裁剪设置（roi_subset）"""
+        datasets = self.config.get('SUBSET', 'datasets',
+                                   fallback='Data/EV_1KM_RefSB, Data/EV_1KM_Emissive, '
+                                            'Data/EV_250_Aggr.1KM_RefSB, Data/EV_250_Aggr.1KM_Emissive')
+        output_dir = self.config.get('SUBSET', 'output_dir', fallback='ROI').strip()
+        if output_dir:
+            output_dir = os.path.join(self.get_download_dir(), os.path.expanduser(output_dir))
+        return {
+            'bbox': tuple(self.config.getfloat('SUBSET', key, fallback=value) for key, value in
+                          (('lat_min', 60.0), ('lat_max', 90.0), ('lon_min', -180.0), ('lon_max', 180.0))),
+            # 逗号分隔，方括号中的逗号属于波段列表
+            'datasets': [item.strip() for item in re.findall(r'(?:[^,\[]|\[[^\]]*\])+', datasets) if item.strip()],
+            'lat_dataset': self.config.get('SUBSET', 'lat_dataset', fallback='Geolocation/Latitude').strip(),
+            'lon_dataset': self.config.get('SUBSET', 'lon_dataset', fallback='Geolocation/Longitude').strip(),
+            'output_dir': output_dir,
+            'chunk_rows': max(1, self.config.getint('SUBSET', 'chunk_rows', fallback=256)),
+            'compression_level': min(9, max(1, self.config.getint('SUBSET', 'compression_level', fallback=4))),
+            'delete_source': self.config.getboolean('SUBSET', 'delete_source', fallback=False),
+        }
+
+    def get_captcha_settings(self):
+        """获取验证码识别设置（CaptchaSolver的参数）"""
+        corpus_dir = self.config.get('CAPTCHA', 'corpus_dir', fallback='captcha_corpus').strip()
+        if corpus_dir:
+            corpus_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.path.expanduser(corpus_dir))
+        return {
+            'charset': self.config.get('CAPTCHA', 'charset', fallback='0123456789abcdefghijklmnopqrstuvwxyz').strip(),
+            'length': max(0, self.config.getint('CAPTCHA', 'length', fallback=4)),
+            'min_confidence': self.config.getfloat('CAPTCHA', 'min_confidence', fallback=0.6),
+            'use_preprocess': self.config.getboolean('CAPTCHA', 'preprocess', fallback=True),
+            'corpus_dir': corpus_dir,
+        }
+
+    def get_captcha_refreshes(self):
+        """获取因识别结果不可信最多刷新验证码的次数"""
+        return max(0, self.config.getint('CAPTCHA', 'max_refreshes', fallback=3))
+
     # 配置文件处理
     # class ConfigHandler:
     #     def __init__(self, config_file='config.ini'):
@@ -0,0 +1,81 @@
+# download_engine.py
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from transfer_metrics import TransferStats
+
+logger = logging.getLogger(__name__)
+
+
+class DownloadResult:
+    """单个文件的下载结果"""
+    def __init__(self, index, protocol, url, success, elapsed, error=None, stats=None):
+        self.index = index          # 在订单中的序号（从1开始）
+        self.protocol = protocol    # 'http' 或 'ftp'
+        self.url = url
+        self.success = success
+        self.elapsed = elapsed      # 耗时（秒）
+        self.error = error          # 异常信息（成功时为None）
+        self.stats = stats          # 传输指标（TransferStats）
+
+
+class DownloadEngine:
+    """并行下载引擎：用线程池同时下载一个订单里的多个HDF文件"""
+    def __init__(self, handlers, max_workers=4):
+        """
+        Args:
+        handlers: 协议到下载函数的映射，如 {'http': func, 'ftp': func}
+                  下载函数接收(url, stats)，返回True/False；stats为TransferStats，由下载函数填写传输细节
+        max_workers: 同时进行的下载数
+        """
+        self.handlers = handlers
+        self.max_workers = max(1, int(max_workers))
+
+    def _download_one(self, index, protocol, url):
+        """在工作线程中下载单个文件，异常不会传出线程"""
+        start = time.time()
+        stats = TransferStats(url, protocol)
+        stats.start()
+        try:
+            success = bool(self.handlers[protocol](url, stats))
+            stats.finish(success)
+            return DownloadResult(index, protocol, url, success, time.time() - start, stats=stats)
+        except Exception as e:
+            stats.finish(False, error=str(e))
+            return DownloadResult(index, protocol, url, False, time.time() - start, error=str(e), stats=stats)
+
+    def run(self, tasks):
+        """
+        下载所有任务并汇总结果
+        Args:
+        tasks: [(protocol, url), ...]
+        Returns:
+        (results, stats)  results按序号排序；stats为 {'total', 'success', 'failed'}
+        """
+        stats = {'total': len(tasks), 'success': 0, 'failed': 0}
+        results = []
+        if not tasks:
+            return results, stats
+
+        workers = min(self.max_workers, len(tasks))
+        logger.info(f"开始并行下载: 共{len(tasks)}个文件, 并行数{workers}")
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='download') as executor:
+            futures = [executor.submit(self._download_one, i, protocol, url)
+                       for i, (protocol, url) in enumerate(tasks, 1)]
+            # 每完成一个就汇报一个，不用等前面的文件
+            for future in as_completed(futures):
+                result = future.result()
+                results.append(result)
+                name = result.protocol.upper()
+                if result.success:
+                    stats['success'] += 1
+                    logger.info(f"✅ 第{result.index}个{name}链接下载成功({result.elapsed:.1f}秒, "
+                                f"{result.stats.throughput_mbps:.2f}MB/s): {result.url}")
+                else:
+                    stats['failed'] += 1
+                    reason = f"（{result.error}）" if result.error else ''
+                    logger.error(f"❌ 第{result.index}个{name}链接下载失败{reason}: {result.url}")
+
+        results.sort(key=lambda r: r.index)
+        return results, stats
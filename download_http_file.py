@@ -1,10 +1,294 @@
 import requests
-import urllib.parse
+from requests.adapters import HTTPAdapter
 from pathlib import Path
+import logging
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from download_manifest import SKIP, FETCH
+from integrity import StreamingHasher, verify_download
+from file_writer import (ChunkWriter, ProgressReporter, preallocate, part_path_for,
+                         DEFAULT_CHUNK_SIZE, DEFAULT_BLOCK_SIZE)
 
+logger = logging.getLogger(__name__)
 
-def download_http_file(url1):
+# 默认保存目录（程序目录下，不随启动时的当前目录变化）
+DEFAULT_SAVE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'FY4B_Downloads')
+
+# 小于该大小的文件不值得分段下载
+SEGMENT_MIN_SIZE = 16 * 1024 * 1024
+
+# 设置请求头，模拟浏览器行为（所有请求共用）
+DEFAULT_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+    'Accept': '*/*',
+    'Accept-Encoding': 'identity',
+    'Connection': 'keep-alive',
+}
+
+# 模块级共享会话（未显式传入session时使用）
+_shared_session = None
+_shared_session_lock = threading.Lock()
+
+
+def create_http_session(pool_size=10):
+    """
+    创建带连接池的会话：TCP/TLS连接在请求之间保持复用，请求头统一设置
+    pool_size: 每个主机保留的长连接数，应不小于并发下载数（文件并行数 × 分段数）
+    """
+    session = requests.Session()
+    session.headers.update(DEFAULT_HEADERS)
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_http_session():
+    """获取模块级共享会话（首次调用时创建）"""
+    global _shared_session
+    with _shared_session_lock:
+        if _shared_session is None:
+            _shared_session = create_http_session()
+        return _shared_session
+
+
+def _fetch_with_resume(get, url, file_path, headers, verify, hasher=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE, block_size=DEFAULT_BLOCK_SIZE, progress_rate=2, stats=None):
+    """
+    发送GET请求并写入本地文件；本地已有部分数据（.part临时文件）时用Range请求从断点继续，返回是否下载完整
+    hasher: StreamingHasher，传入时在写入的同时计算整个文件的校验和
+    chunk_size/block_size: 网络读取大小/磁盘写入块大小
+    progress_rate: 每秒最多刷新几次进度
+    stats: TransferStats，传入时记录传输字节和首字节时间
+    """
+    # 已有的临时文件大小即为续传起点
+    part_path = Path(part_path_for(file_path))
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    request_headers = dict(headers)
+    if offset > 0:
+        request_headers['Range'] = f'bytes={offset}-'
+
+    # 发送GET请求，stream=True用于大文件下载
+    response = get(url, stream=True, verify=verify, headers=request_headers, timeout=30)
+    with response:
+        # 请求范围超出文件末尾：临时文件不比远程文件短，说明它是预分配后异常退出留下的，内容不可信
+        if response.status_code == 416 and offset > 0:
+            logger.warning(f"临时文件长度异常，重新下载: {part_path}")
+            part_path.unlink()
+            return _fetch_with_resume(get, url, file_path, headers, verify, hasher,
+                                      chunk_size, block_size, progress_rate, stats)
+
+        if response.status_code == 206 and offset > 0:
+            # 服务器支持续传，追加写入
+            logger.info(f"从第{offset}字节处继续下载: {file_path.name}")
+        elif response.status_code == 200:
+            # 服务器忽略了Range（或本地没有部分文件），从头下载
+            offset = 0
+        elif response.status_code >= 500:
+            # 服务器临时错误，交给外层重试
+            raise requests.exceptions.HTTPError(f"服务器错误，状态码: {response.status_code}")
+        else:
+            logger.error(f"下载失败，状态码: {response.status_code}，响应内容: {response.text[:500]}")
+            return False
+
+        # 获取文件大小（206响应的content-length是剩余部分的长度）
+        content_length = int(response.headers.get('content-length', 0))
+        total_size = offset + content_length if content_length else 0
+
+        # 续传时校验和要包含本地已有的部分
+        if hasher is not None:
+            if offset > 0:
+                hasher.seed_from_file(part_path, offset)
+            else:
+                hasher.reset()
+
+        # 写入临时文件，完整后原子重命名
+        progress = ProgressReporter(file_path.name, total_size, max_per_second=progress_rate)
+        with ChunkWriter(file_path, total_size, offset, block_size=block_size,
+                         hasher=hasher, progress=progress) as writer:
+            if total_size == 0:
+                content = response.content
+                writer.write(content)
+                if stats is not None:
+                    stats.add_bytes(len(content))
+            else:
+                for chunk in response.iter_content(chunk_size=chunk_size):
+                    if chunk:
+                        writer.write(chunk)
+                        if stats is not None:
+                            stats.add_bytes(len(chunk))
+
+                # 连接提前断开时数据不完整，交给外层从断点重试
+                if writer.position < total_size:
+                    raise IOError(f"连接中断，已下载{writer.position}/{total_size}字节")
+            writer.commit()
+
+    logger.info(f"文件下载完成: {file_path}（{os.path.getsize(file_path)} 字节）")
+    return True
+
+
+def probe_http_file(get, url, headers, verify, head=None):
+    """
+    探测文件大小以及服务器是否支持Range请求，返回(文件大小, 是否支持分段)
+    先发HEAD请求；HEAD失败或没有给出Accept-Ranges时，再请求第一个字节确认
+    （服务器忽略Range时这个GET会开始传输整个文件，只读响应头后立即关闭）
+    """
+    if head is not None:
+        try:
+            response = head(url, verify=verify, headers=headers, timeout=30, allow_redirects=True)
+            with response:
+                if response.status_code == 200:
+                    size = int(response.headers.get('content-length', 0))
+                    accept_ranges = response.headers.get('accept-ranges', '').lower()
+                    if size and accept_ranges == 'bytes':
+                        return size, True
+                    if size and accept_ranges == 'none':
+                        return size, False
+        except requests.exceptions.RequestException as e:
+            logger.info(f"HEAD请求失败: {e}")
+
+    request_headers = dict(headers)
+    request_headers['Range'] = 'bytes=0-0'
+    response = get(url, stream=True, verify=verify, headers=request_headers, timeout=30)
+    with response:
+        if response.status_code == 206:
+            # Content-Range: bytes 0-0/123456
+            content_range = response.headers.get('content-range', '')
+            total = content_range.rsplit('/', 1)[-1]
+            if total.isdigit():
+                return int(total), True
+        if response.status_code == 200:
+            return int(response.headers.get('content-length', 0)), False
+    return 0, False
+
+
+def _split_ranges(total_size, segments):
+    """把[0, total_size)平均分成segments段，返回[(start, end), ...]（end包含在内）"""
+    segments = max(1, min(segments, total_size))
+    step = total_size // segments
+    ranges = []
+    for i in range(segments):
+        start = i * step
+        end = total_size - 1 if i == segments - 1 else start + step - 1
+        ranges.append((start, end))
+    return ranges
+
+
+def _fetch_segment(get, url, part_path, headers, verify, start, end, retry_attempts, chunk_size=DEFAULT_CHUNK_SIZE,
+                   stats=None, on_data=None):
+    """
+    下载一个字节区间并写到文件的对应位置，失败后从本段已写入的位置继续，返回写入的字节数
+    on_data: 每写入一块数据时以字节数调用（汇总各段的进度）
+    """
+    position = start
+    for attempt in range(retry_attempts + 1):
+        try:
+            request_headers = dict(headers)
+            request_headers['Range'] = f'bytes={position}-{end}'
+            response = get(url, stream=True, verify=verify, headers=request_headers, timeout=30)
+            with response:
+                if response.status_code != 206:
+                    raise requests.exceptions.HTTPError(f"分段请求未返回206，状态码: {response.status_code}")
+                # 每个线程用自己的文件句柄定位写入，互不干扰
+                with open(part_path, 'r+b') as file:
+                    file.seek(position)
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        if not chunk:
+                            continue
+                        # 服务器多给的数据不能写进下一段
+                        chunk = chunk[:end + 1 - position]
+                        file.write(chunk)
+                        position += len(chunk)
+                        if stats is not None:
+                            stats.add_bytes(len(chunk))
+                        if on_data is not None:
+                            on_data(len(chunk))
+                        if position > end:
+                            break
+            if position > end:
+                return position - start
+            raise IOError(f"分段数据不完整: {position - start}/{end - start + 1}字节")
+        except Exception as e:
+            if attempt < retry_attempts:
+                time.sleep(2 ** attempt)
+            else:
+                raise IOError(f"分段 {start}-{end} 下载失败: {e}")
+    return position - start
+
+
+def download_http_segmented(get, url, file_path, headers, total_size, segments=4, verify=False, retry_attempts=3,
+                            chunk_size=DEFAULT_CHUNK_SIZE, progress_rate=2, stats=None):
+    """
+    多连接分段下载单个文件
+    Args:
+    get: 发送请求的函数（如 session.get）
+    file_path: 最终保存路径（下载过程中写入同名 .part 临时文件）
+    total_size: 文件总大小（由probe_http_file探测得到）
+    segments: 分段数（即并发连接数）
+    progress_rate: 每秒最多输出几次进度（各段合计为一个文件的进度）
+    """
+    file_path = Path(file_path)
+    part_path = Path(part_path_for(file_path))
+    ranges = _split_ranges(total_size, segments)
+
+    # 预分配完整大小的文件，各段直接写入自己的位置
+    with open(part_path, 'wb') as file:
+        preallocate(file, total_size)
+
+    logger.info(f"分段下载: {file_path.name}，{total_size}字节，{len(ranges)}段")
+    progress = ProgressReporter(file_path.name, total_size, max_per_second=progress_rate)
+    progress_lock = threading.Lock()
+    downloaded = [0]
+
+    def on_data(size):
+        with progress_lock:
+            downloaded[0] += size
+            progress.update(downloaded[0])
+
+    try:
+        with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix='segment') as executor:
+            futures = {executor.submit(_fetch_segment, get, url, part_path, headers, verify,
+                                       start, end, retry_attempts, chunk_size, stats, on_data): (start, end)
+                       for start, end in ranges}
+            written = {futures[f]: f.result() for f in futures}
+
+        # 校验：各段首尾相接、覆盖整个文件，且每段都写满
+        expected_start = 0
+        for start, end in sorted(written):
+            if start != expected_start or written[(start, end)] != end - start + 1:
+                raise IOError(f"分段 {start}-{end} 未完整覆盖")
+            expected_start = end + 1
+        if expected_start != total_size or os.path.getsize(part_path) != total_size:
+            raise IOError(f"分段未覆盖整个文件: {expected_start}/{total_size}字节")
+    except Exception:
+        # 分段状态无法续传，删除临时文件，避免被误认为完整文件
+        if part_path.exists():
+            part_path.unlink()
+        raise
+
+    os.replace(part_path, file_path)
+    logger.info(f"文件下载完成: {file_path}（{os.path.getsize(file_path)} 字节）")
+    return True
+
+
+def download_http_file(url1, retry_attempts=3, segments=1, segment_min_size=SEGMENT_MIN_SIZE, session=None,
+                       manifest=None, checksum_algorithm='md5', expected_checksum=None,
+                       chunk_size=DEFAULT_CHUNK_SIZE, block_size=DEFAULT_BLOCK_SIZE, progress_rate=2, stats=None,
+                       save_dir=DEFAULT_SAVE_DIR, layout=None):
+    """
+    下载HTTP文件，传输中断后从已下载的字节处续传，最多重试retry_attempts次
+    segments大于1且服务器支持Range时，大文件按字节区间多连接并行下载
+    session: 复用的会话（见create_http_session），不传时使用模块级共享会话
+    manifest: 下载清单（DownloadManifest），传入时跳过已完整下载的文件
+    checksum_algorithm: 边下载边计算的校验算法（md5/sha256/xxh64），为空时不计算
+    expected_checksum: 门户提供的校验和，有则与下载结果比对
+    chunk_size/block_size/progress_rate: 见 file_writer.ChunkWriter 和 ProgressReporter
+    stats: TransferStats，传入时记录传输字节、首字节时间、重试次数和续传起点
+    save_dir: 保存目录（默认为程序目录下的FY4B_Downloads）
+    layout: StorageLayout，传入时按卫星/产品/日期存放到子目录（save_dir不再使用）
+    """
   # 禁用不安全的请求警告（仅用于开发环境）
 
     import urllib3
@@ -20,80 +304,129 @@ def download_http_file(url1):
     filename = url_without_params.split('/')[-1]
     # 文件名从URL中提取
 
-    # 创建下载目录
-    download_dir = Path("FY4B_Downloads")
-    download_dir.mkdir(exist_ok=True)
+    # 完整的文件路径（下载过程中写入同名.part临时文件）
+    if layout is not None:
+        file_path = Path(layout.path_for(filename))
+    else:
+        download_dir = Path(save_dir)
+        download_dir.mkdir(parents=True, exist_ok=True)
+        file_path = download_dir / filename
+    part_path = Path(part_path_for(file_path))
 
-    # 完整的文件路径
-    file_path = download_dir / filename
+    logger.info(f"开始下载文件: {filename}")
 
-    # 设置请求头，模拟浏览器行为
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
-        'Accept': '*/*',
-        'Accept-Encoding': 'identity',
-        'Connection': 'keep-alive',
-    }
+    # 复用会话：同一批文件共享已建立的TCP/TLS连接
+    session = session or get_http_session()
 
+    # 探测远程文件大小和Range支持（跳过判断、下载清单和分段下载都需要）
+    probe_size, accept_ranges = 0, False
     try:
-        print(f"开始下载文件: {filename}")
+        probe_size, accept_ranges = probe_http_file(session.get, url, {}, verify=False, head=session.head)
+    except Exception as e:
+        logger.warning(f"探测文件信息失败: {e}")
 
-        # 创建会话对象
-        session = requests.Session()
-        session.headers.update(headers)
+    # 旧版本直接写正式文件名，留下的不完整文件改为临时文件继续续传
+    if probe_size and file_path.exists() and file_path.stat().st_size < probe_size and not part_path.exists():
+        os.replace(file_path, part_path)
 
-        # 发送GET请求，stream=True用于大文件下载
-        response = session.get(url, stream=True, verify=False, timeout=30)
+    # 对照下载清单：完整的跳过，远程已变化的删除后重新下载，部分文件续传
+    if manifest is not None:
+        action, reason = manifest.plan(filename, str(file_path), probe_size)
+        if action == SKIP:
+            if manifest.get(filename) is None:
+                manifest.record_complete(filename, str(file_path), url, remote_size=probe_size or None)
+            logger.info(f"跳过（{reason}）: {file_path}")
+            if stats is not None:
+                stats.skipped = True
+            return True
+        if action == FETCH:
+            for path in (file_path, part_path):
+                if path.exists():
+                    logger.info(f"重新下载（{reason}）: {path}")
+                    path.unlink()
 
-        # 检查请求是否成功
-        if response.status_code == 200:
-            # 获取文件大小
-            total_size = int(response.headers.get('content-length', 0))
-
-            # 写入文件
-            with open(file_path, 'wb') as file:
-                if total_size == 0:
-                    file.write(response.content)
-                else:
-                    downloaded = 0
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            file.write(chunk)
-                            downloaded += len(chunk)
-                            # 显示下载进度
-                            if total_size > 0:
-                                progress = (downloaded / total_size) * 100
-                                print(f"\r下载进度: {progress:.2f}%", end='', flush=True)
-
-            print(f"\n文件下载完成: {file_path}")
-            print(f"文件大小: {os.path.getsize(file_path)} 字节")
+    # 正式文件名只在下载完整后才出现，存在即表示已完成
+    if file_path.exists() and (not probe_size or file_path.stat().st_size == probe_size):
+        logger.info(f"文件已完整，无需下载: {file_path}")
+        if stats is not None:
+            stats.skipped = True
+        return True
+    if file_path.exists():
+        file_path.unlink()  # 与远程大小不符（如远程文件已更新）
+
+    if stats is not None and part_path.exists():
+        stats.resume_offset = part_path.stat().st_size
+
+    hasher = StreamingHasher(checksum_algorithm) if checksum_algorithm else None
+    success, checksum = _download_to_path(session, url, file_path, probe_size, accept_ranges,
+                                          segments, segment_min_size, retry_attempts, hasher,
+                                          chunk_size, block_size, progress_rate, stats)
+    if not success:
+        return False
+
+    # 分段下载是乱序写入的，没有流式校验和；合并完成后补读一遍计算，清单中同样记录校验和
+    if checksum is None and hasher is not None:
+        hasher.seed_from_file(file_path, os.path.getsize(file_path))
+        checksum = hasher.hexdigest()
+
+    # 完整性检查：大小、校验和、HDF5文件头
+    ok, message = verify_download(str(file_path), expected_size=probe_size or None,
+                                  expected_checksum=expected_checksum, actual_checksum=checksum)
+    if not ok:
+        logger.error(f"完整性检查失败，删除文件: {message}")
+        file_path.unlink()
+        if manifest is not None:
+            manifest.forget(filename)
+        return False
+
+    if manifest is not None:
+        manifest.record_complete(filename, str(file_path), url, remote_size=probe_size or None, checksum=checksum)
+    return True
 
-            return True
-        else:
-            print(f"下载失败，状态码: {response.status_code}")
-            print(f"响应内容: {response.text[:500]}")
-            return False
 
-    except requests.exceptions.SSLError as e:
-        print(f"SSL错误: {e}")
-        print("尝试使用验证...")
-        # 如果SSL验证失败，尝试使用验证
+def _download_to_path(session, url, file_path, total_size, accept_ranges, segments, segment_min_size, retry_attempts,
+                      hasher=None, chunk_size=DEFAULT_CHUNK_SIZE, block_size=DEFAULT_BLOCK_SIZE, progress_rate=2,
+                      stats=None):
+    """执行下载：条件满足时分段下载，否则单连接下载并断点续传；返回(是否成功, 流式校验和)"""
+    # 分段下载：仅在没有临时文件时使用（部分文件由单连接续传处理）
+    if segments > 1 and not Path(part_path_for(file_path)).exists():
         try:
-            response = requests.get(url, stream=True, verify=True, headers=headers, timeout=30)
-            if response.status_code == 200:
-                with open(file_path, 'wb') as file:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        if chunk:
-                            file.write(chunk)
-                print(f"文件下载完成: {file_path}")
-                return True
+            if accept_ranges and total_size >= segment_min_size:
+                success = download_http_segmented(session.get, url, file_path, {}, total_size,
+                                                  segments=segments, verify=False, retry_attempts=retry_attempts,
+                                                  chunk_size=chunk_size, progress_rate=progress_rate,
+                                                  stats=stats)
+                return success, None
+            if not accept_ranges:
+                logger.info(f"服务器不支持Range请求，使用单连接下载: {file_path.name}")
         except Exception as e:
-            print(f"再次尝试失败: {e}")
-            return False
+            logger.warning(f"分段下载失败: {e}，改用单连接下载")
 
-    except Exception as e:
-        print(f"下载过程中出现错误: {e}")
-        return False
+    options = dict(hasher=hasher, chunk_size=chunk_size, block_size=block_size, progress_rate=progress_rate,
+                   stats=stats)
+    for attempt in range(retry_attempts + 1):
+        if stats is not None:
+            stats.retries = attempt
+        try:
+            try:
+                success = _fetch_with_resume(session.get, url, file_path, {}, verify=False, **options)
+            except requests.exceptions.SSLError as e:
+                logger.warning(f"SSL错误: {e}，尝试使用验证...")
+                # 如果SSL验证失败，尝试使用验证（同样从断点续传，仍复用会话的连接池）
+                success = _fetch_with_resume(session.get, url, file_path, {}, verify=True, **options)
+            checksum = hasher.hexdigest() if success and hasher is not None else None
+            return success, checksum
+
+        except Exception as e:
+            if attempt < retry_attempts:
+                delay = 2 ** attempt
+                logger.warning(f"下载中断 {file_path.name}: {e}，{delay}秒后从断点续传（重试 {attempt + 1}/{retry_attempts}）")
+                time.sleep(delay)
+            else:
+                logger.error(f"下载过程中出现错误 {file_path.name}: {e}")
+                return False, None
+
+    return False, None
 
 
 # def main():
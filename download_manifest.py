@@ -0,0 +1,134 @@
+# download_manifest.py
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from file_writer import part_path_for
+from link_extractor import strip_credentials
+
+logger = logging.getLogger(__name__)
+
+# 清单文件名（保存在下载目录中）
+MANIFEST_FILE = '.download_manifest.sqlite'
+
+# plan() 的决策结果
+SKIP = 'skip'       # 本地文件完整，跳过
+RESUME = 'resume'   # 本地有部分文件，续传
+FETCH = 'fetch'     # 从头下载（本地没有文件，或远程文件已变化）
+
+
+class DownloadManifest:
+    """下载清单：记录每个已完成的文件，重新运行时据此跳过、续传或重新下载"""
+    def __init__(self, download_dir):
+        os.makedirs(download_dir, exist_ok=True)
+        self.path = os.path.join(download_dir, MANIFEST_FILE)
+        self._lock = threading.Lock()  # 多个下载线程共用一个连接
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS files (
+                       filename     TEXT PRIMARY KEY,
+                       remote_size  INTEGER,
+                       local_size   INTEGER,
+                       checksum     TEXT,
+                       source_url   TEXT,
+                       local_path   TEXT,
+                       completed_at TEXT,
+                       processed_into TEXT
+                   )'''
+            )
+            # 旧版本的清单没有 processed_into 列
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(files)')}
+            if 'processed_into' not in columns:
+                self._conn.execute('ALTER TABLE files ADD COLUMN processed_into TEXT')
+            # 旧版本记录的链接带有订单的FTP账号，打开时一并去掉
+            rows = self._conn.execute("SELECT filename, source_url FROM files WHERE source_url LIKE '%@%'").fetchall()
+            self._conn.executemany('UPDATE files SET source_url = ? WHERE filename = ?',
+                                   [(strip_credentials(url), filename) for filename, url in rows])
+
+    def get(self, filename):
+        """查询文件的下载记录，没有记录时返回None"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM files WHERE filename = ?', (filename,)).fetchone()
+        return dict(row) if row else None
+
+    def record_complete(self, filename, local_path, source_url, remote_size=None, checksum=None):
+        """记录一个下载完成的文件（链接中的用户名和密码不保存）"""
+        local_size = os.path.getsize(local_path)
+        if remote_size is None:
+            remote_size = local_size
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO files
+                   (filename, remote_size, local_size, checksum, source_url, local_path, completed_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (filename, remote_size, local_size, checksum, strip_credentials(source_url),
+                 os.path.abspath(local_path), datetime.now().isoformat(timespec='seconds'))
+            )
+
+    def mark_processed(self, filename, output_path):
+        """
+        记录原始文件已被后处理结果代替并删除（如 roi_subset 的 delete_source）
+        记录保留，plan() 对它返回SKIP，不会因为本地没有文件而重新下载
+        """
+        with self._lock, self._conn:
+            self._conn.execute('UPDATE files SET processed_into = ? WHERE filename = ?',
+                               (os.path.abspath(output_path), filename))
+
+    def relocate(self, filename, local_path):
+        """文件被移动后更新记录的本地路径，返回是否有这个文件的记录"""
+        with self._lock, self._conn:
+            cursor = self._conn.execute('UPDATE files SET local_path = ? WHERE filename = ?',
+                                        (os.path.abspath(local_path), filename))
+        return cursor.rowcount > 0
+
+    def forget(self, filename):
+        """删除文件的下载记录"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM files WHERE filename = ?', (filename,))
+
+    def plan(self, filename, local_path, remote_size):
+        """
+        根据清单、本地文件和远程大小决定如何处理一个文件
+        正式文件名只在下载完整后出现，未完成的数据在 local_path + '.part' 临时文件中
+        Args:
+        remote_size: 远程文件大小（SIZE/HEAD探测结果，未知时传0或None）
+        Returns:
+        (SKIP/RESUME/FETCH, 原因说明)
+        """
+        entry = self.get(filename)
+        local_size = os.path.getsize(local_path) if os.path.exists(local_path) else None
+        part_path = part_path_for(local_path)
+        part_size = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+
+        if (entry and entry['processed_into'] and local_size is None
+                and (not remote_size or entry['remote_size'] == remote_size)):
+            # 原始文件处理后已按设置删除，远程文件没有变化时不再下载
+            return SKIP, f"已处理为 {os.path.basename(entry['processed_into'])}，原始文件已删除"
+
+        if not remote_size:
+            # 远程大小未知：只能信任清单记录和正式文件
+            if local_size is not None and (entry is None or local_size == entry['local_size']):
+                return SKIP, '本地文件完整'
+            return (RESUME, '远程大小未知，尝试续传') if part_size else (FETCH, '本地无文件')
+
+        if entry and entry['remote_size'] != remote_size:
+            # 远程文件被替换过，本地内容不能再用
+            return FETCH, f"远程文件已变化（{entry['remote_size']} → {remote_size}字节）"
+        if local_size == remote_size:
+            return SKIP, '本地文件完整'
+        if local_size is not None:
+            return FETCH, f'本地文件大小不符（{local_size}/{remote_size}字节）'
+        if 0 < part_size < remote_size:
+            return RESUME, f'已下载{part_size}/{remote_size}字节'
+        if part_size >= remote_size:
+            return FETCH, '临时文件长度异常'
+        return FETCH, '本地无文件'
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
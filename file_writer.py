@@ -0,0 +1,145 @@
+# file_writer.py
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+# 下载过程中使用的临时文件后缀，完成后原子重命名为正式文件名
+PART_SUFFIX = '.part'
+
+DEFAULT_CHUNK_SIZE = 64 * 1024          # 每次从网络读取的字节数
+DEFAULT_BLOCK_SIZE = 1024 * 1024        # 写入磁盘的块大小（缓冲满一块才写一次）
+
+
+def part_path_for(path):
+    """正式文件对应的临时文件路径"""
+    return str(path) + PART_SUFFIX
+
+
+def preallocate(file, size):
+    """为文件预分配size字节的磁盘空间（支持fallocate时真正分配，否则扩展文件长度）"""
+    if hasattr(os, 'posix_fallocate'):
+        try:
+            os.posix_fallocate(file.fileno(), 0, size)
+            return
+        except OSError:
+            pass  # 部分文件系统不支持，退回到truncate
+    file.truncate(size)
+
+
+def log_progress(label, done, total):
+    """默认进度输出：每次一行完整的日志（多个文件同时下载时各行互不穿插）"""
+    logger.info(f"下载进度: {label} {done / total * 100:.1f}%（{done / 1024 / 1024:.1f}/{total / 1024 / 1024:.1f} MB）")
+
+
+class ProgressReporter:
+    """限频进度回调：每秒最多回调max_per_second次（0为不回调），最后一次（完成时）一定回调"""
+    def __init__(self, label, total, callback=log_progress, max_per_second=2):
+        self.label = label
+        self.total = total
+        self.callback = callback if max_per_second > 0 else None  # 0表示不显示进度
+        self.interval = 1.0 / max_per_second if max_per_second > 0 else 0
+        self._last = 0.0
+        self._reported_done = False
+
+    def update(self, done):
+        """报告已完成的字节数"""
+        if not self.total or self.callback is None:
+            return
+        now = time.monotonic()
+        finished = done >= self.total
+        if finished or now - self._last >= self.interval:
+            if finished:
+                if self._reported_done:
+                    return
+                self._reported_done = True
+            self._last = now
+            self.callback(self.label, done, self.total)
+
+
+class ChunkWriter:
+    """
+    下载文件的高吞吐写入器：
+    - 写入 正式文件名.part 临时文件，完成后原子重命名，正式文件名只会对应完整文件
+    - 数据先拷贝进可复用的缓冲区，攒满一块才写一次磁盘
+    - 从头下载且已知大小时预分配磁盘空间
+    - 可同时更新校验和（StreamingHasher）和限频进度（ProgressReporter）
+    用法：
+        with ChunkWriter(path, total_size, offset) as writer:
+            for chunk in ...:
+                writer.write(chunk)
+            writer.commit()
+    未调用commit就退出时，临时文件被截断到实际写入的长度，下次可以从这里续传
+    """
+    def __init__(self, path, total_size=0, offset=0, block_size=DEFAULT_BLOCK_SIZE,
+                 preallocate_space=True, hasher=None, progress=None):
+        self.path = str(path)
+        self.part_path = part_path_for(self.path)
+        self.total_size = total_size or 0
+        self.position = offset              # 已确认的字节数（含缓冲区中的数据）
+        self.hasher = hasher
+        self.progress = progress
+        self._buffer = bytearray(block_size)
+        self._view = memoryview(self._buffer)
+        self._filled = 0
+        self._committed = False
+
+        if offset > 0:
+            # 续传：在已有临时文件末尾继续写
+            self._file = open(self.part_path, 'r+b')
+            self._file.seek(offset)
+        else:
+            self._file = open(self.part_path, 'wb')
+            if preallocate_space and self.total_size > 0:
+                preallocate(self._file, self.total_size)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if not self._committed:
+            self.abort()
+        return False
+
+    def write(self, data):
+        """写入一块数据"""
+        size = len(data)
+        if self.hasher is not None:
+            self.hasher.update(data)
+
+        if size >= len(self._buffer):
+            # 数据块比缓冲区还大：先写出缓冲，再直接写数据
+            self._flush()
+            self._file.write(data)
+        else:
+            if self._filled + size > len(self._buffer):
+                self._flush()
+            self._buffer[self._filled:self._filled + size] = data
+            self._filled += size
+
+        self.position += size
+        if self.progress is not None:
+            self.progress.update(self.position)
+
+    def _flush(self):
+        """把缓冲区中的数据写到磁盘"""
+        if self._filled:
+            self._file.write(self._view[:self._filled])
+            self._filled = 0
+
+    def commit(self):
+        """完成写入：截掉多余的预分配空间，关闭后原子重命名为正式文件"""
+        self._flush()
+        self._file.truncate(self.position)
+        self._file.close()
+        os.replace(self.part_path, self.path)
+        self._committed = True
+
+    def abort(self):
+        """中断写入：保留已写数据（截断到实际长度，去掉预分配的空白）供续传"""
+        try:
+            self._flush()
+            self._file.truncate(self.position)
+        finally:
+            self._file.close()
@@ -0,0 +1,105 @@
+# ftp_pool.py
+import logging
+import threading
+from contextlib import contextmanager
+from ftplib import FTP, all_errors
+
+logger = logging.getLogger(__name__)
+
+
+class FTPConnectionPool:
+    """FTP控制连接池：按 (host, user) 复用已登录、已切换到二进制模式的连接"""
+    def __init__(self, max_per_host=4, timeout=60):
+        """
+        Args:
+        max_per_host: 每个主机同时使用的最大连接数（超出时等待空闲连接）
+        timeout: 连接的socket超时时间（秒）
+        """
+        self.max_per_host = max(1, int(max_per_host))
+        self.timeout = timeout
+        self._idle = {}         # (host, user) -> [空闲的FTP连接]
+        self._limits = {}       # host -> 限制并发连接数的信号量
+        self._lock = threading.Lock()
+
+    def _host_limit(self, host):
+        """获取某个主机的连接数信号量"""
+        with self._lock:
+            if host not in self._limits:
+                self._limits[host] = threading.BoundedSemaphore(self.max_per_host)
+            return self._limits[host]
+
+    def _connect(self, host, user, password):
+        """新建连接：连接、登录、切换二进制模式"""
+        ftp = FTP(host, timeout=self.timeout)
+        ftp.login(user, password)
+        ftp.voidcmd('TYPE I')  # 二进制传输模式
+        logger.info(f"新建FTP连接: {user}@{host}")
+        return ftp
+
+    @staticmethod
+    def _close(ftp):
+        """关闭连接（连接已断开时忽略错误）"""
+        try:
+            ftp.quit()
+        except Exception:
+            try:
+                ftp.close()
+            except Exception:
+                pass
+
+    def _acquire(self, host, user, password):
+        """取一个可用连接：优先复用空闲连接（NOOP检查健康），否则新建"""
+        key = (host, user)
+        while True:
+            with self._lock:
+                idle = self._idle.get(key)
+                ftp = idle.pop() if idle else None
+            if ftp is None:
+                return self._connect(host, user, password)
+            try:
+                ftp.voidcmd('NOOP')  # 健康检查：服务器可能已关闭空闲连接
+                return ftp
+            except all_errors:
+                logger.info(f"FTP空闲连接已失效，重新连接: {user}@{host}")
+                self._close(ftp)
+
+    def _release(self, host, user, ftp):
+        """归还连接到空闲列表"""
+        with self._lock:
+            self._idle.setdefault((host, user), []).append(ftp)
+
+    @contextmanager
+    def connection(self, host, user, password):
+        """
+        借用一个连接，用完自动归还；使用过程中出错的连接会被关闭而不是归还
+        用法：
+            with pool.connection(host, user, password) as ftp:
+                ftp.retrbinary(...)
+        """
+        limit = self._host_limit(host)
+        limit.acquire()
+        ftp = None
+        try:
+            ftp = self._acquire(host, user, password)
+            yield ftp
+        except BaseException:
+            if ftp is not None:
+                self._close(ftp)
+                ftp = None
+            raise
+        finally:
+            if ftp is not None:
+                self._release(host, user, ftp)
+            limit.release()
+
+    def close_all(self):
+        """关闭所有空闲连接"""
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for ftp in connections:
+                self._close(ftp)
+
+
+# 默认连接池：没有显式传入连接池时使用
+default_pool = FTPConnectionPool()
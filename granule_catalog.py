@@ -0,0 +1,276 @@
+# granule_catalog.py
+"""
+本地数据目录：记录已下载的每个HDF文件（卫星、仪器、产品、观测时间、大小、校验值、路径），支持按条件查询
+下载完成时自动写入；已有的目录可用 rebuild 增量扫描补录
+用法：
+    python granule_catalog.py query --satellite FY3D --product 1000M --start "2025-10-07 03:00" --end "2025-10-07 06:00"
+    python granule_catalog.py rebuild [目录 ...]
+    python granule_catalog.py stats
+"""
+import argparse
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+
+from link_extractor import parse_granule_name, strip_credentials
+
+logger = logging.getLogger(__name__)
+
+# 下载清单文件名（与 download_manifest.MANIFEST_FILE 相同），补录时从中读取已计算的校验值
+_MANIFEST_FILE = '.download_manifest.sqlite'
+
+_COLUMNS = ('filename', 'satellite', 'instrument', 'region', 'level', 'product', 'unit', 'observed_at',
+            'size', 'checksum', 'path', 'mtime', 'source_url', 'added_at')
+
+
+def _observed_at(fields):
+    """文件名中的观测时间，格式为 'YYYY-MM-DD HH:MM'（可以按字符串比较范围）"""
+    if not fields:
+        return None
+    return datetime.strptime(fields['date'] + fields['time'], '%Y%m%d%H%M').strftime('%Y-%m-%d %H:%M')
+
+
+def parse_time(value):
+    """把 2025-10-07、2025-10-07 03:00、202510070300 等写法转成目录中的时间格式"""
+    value = value.strip()
+    for fmt in ('%Y-%m-%d %H:%M', '%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M', '%Y-%m-%d', '%Y%m%d%H%M', '%Y%m%d'):
+        try:
+            return datetime.strptime(value, fmt).strftime('%Y-%m-%d %H:%M')
+        except ValueError:
+            continue
+    raise ValueError(f"无法识别的时间: {value}")
+
+
+class GranuleCatalog:
+    """已下载文件的SQLite目录，按 (卫星, 产品, 观测时间) 建索引"""
+    def __init__(self, path):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self._lock = threading.Lock()  # 多个下载线程共用一个连接
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS granules (
+                       filename    TEXT PRIMARY KEY,
+                       satellite   TEXT,
+                       instrument  TEXT,
+                       region      TEXT,
+                       level       TEXT,
+                       product     TEXT,
+                       unit        TEXT,
+                       observed_at TEXT,
+                       size        INTEGER,
+                       checksum    TEXT,
+                       path        TEXT,
+                       mtime       REAL,
+                       source_url  TEXT,
+                       added_at    TEXT
+                   )'''
+            )
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_granules_scene '
+                               'ON granules (satellite, product, observed_at)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_granules_time ON granules (observed_at)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_granules_path ON granules (path)')
+
+    def add(self, path, checksum=None, source_url=None):
+        """记录一个文件（下载完成或补录时调用），已有记录时更新"""
+        filename = os.path.basename(path)
+        fields = parse_granule_name(filename)
+        stat = os.stat(path)
+        row = {
+            'filename': filename,
+            'satellite': fields and fields['satellite'],
+            'instrument': fields and fields['instrument'],
+            'region': fields and fields['region'],
+            'level': fields and fields['level'],
+            'product': fields and fields['product'],
+            'unit': fields and fields['unit'],
+            'observed_at': _observed_at(fields),
+            'size': stat.st_size,
+            'checksum': checksum,
+            'path': os.path.abspath(path),
+            'mtime': stat.st_mtime,
+            'source_url': strip_credentials(source_url),
+            'added_at': datetime.now().isoformat(timespec='seconds'),
+        }
+        with self._lock, self._conn:
+            if checksum is None or source_url is None:
+                # 补录时不覆盖下载时记录的校验值和来源
+                old = self._conn.execute('SELECT checksum, source_url FROM granules WHERE filename = ?',
+                                         (filename,)).fetchone()
+                if old:
+                    row['checksum'] = checksum or old['checksum']
+                    row['source_url'] = source_url or old['source_url']
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO granules ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})",
+                [row[column] for column in _COLUMNS]
+            )
+
+    def remove(self, path):
+        """删除一个文件的记录（文件被删除后调用）"""
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM granules WHERE path = ?', (os.path.abspath(path),))
+
+    def get(self, filename):
+        """查询一个文件的记录，没有时返回None"""
+        with self._lock:
+            row = self._conn.execute('SELECT * FROM granules WHERE filename = ?', (filename,)).fetchone()
+        return dict(row) if row else None
+
+    def query(self, satellite=None, instrument=None, product=None, region=None, start=None, end=None, limit=None):
+        """
+        按条件查询，结果按观测时间排序
+        Args:
+        start/end: 观测时间范围（含两端），'YYYY-MM-DD HH:MM' 等格式，见 parse_time
+        Returns:
+        [记录字典, ...]
+        """
+        conditions, params = [], []
+        for column, value in (('satellite', satellite), ('instrument', instrument),
+                              ('product', product), ('region', region)):
+            if value:
+                conditions.append(f'{column} = ?')
+                params.append(value.upper())
+        if start:
+            conditions.append('observed_at >= ?')
+            params.append(parse_time(start))
+        if end:
+            conditions.append('observed_at <= ?')
+            params.append(parse_time(end))
+        sql = 'SELECT * FROM granules'
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY observed_at, filename'
+        if limit:
+            sql += f' LIMIT {int(limit)}'
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def stats(self):
+        """按卫星、仪器、产品统计文件数和总大小"""
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(
+                '''SELECT satellite, instrument, product, COUNT(*) AS files, SUM(size) AS bytes,
+                          MIN(observed_at) AS first, MAX(observed_at) AS last
+                   FROM granules GROUP BY satellite, instrument, product
+                   ORDER BY satellite, instrument, product''')]
+
+    def rebuild(self, directory):
+        """
+        增量扫描目录（含子目录）：只处理新增或大小/修改时间变化的HDF文件，删除已不存在的文件的记录
+        新增文件的校验值取自该目录下载清单中下载时计算的值
+        Returns:
+        {'added': 新增或更新数, 'unchanged': 未变化数, 'removed': 删除数}
+        """
+        directory = os.path.abspath(directory)
+        prefix = os.path.join(directory, '')
+        with self._lock:
+            # 按前缀比较而不用 LIKE：目录名中的 _ 和 % 是 LIKE 的通配符
+            known = {row['path']: (row['size'], row['mtime']) for row in self._conn.execute(
+                'SELECT path, size, mtime FROM granules WHERE substr(path, 1, ?) = ?', (len(prefix), prefix))}
+        counts = {'added': 0, 'unchanged': 0, 'removed': 0}
+        seen = set()
+        # 下载清单只在下载目录根部，分层存放的文件也记录在其中
+        checksums = _manifest_checksums(directory)
+        for root, _, files in os.walk(directory):
+            for name in files:
+                if not name.lower().endswith('.hdf'):
+                    continue
+                path = os.path.join(root, name)
+                seen.add(path)
+                stat = os.stat(path)
+                if known.get(path) == (stat.st_size, stat.st_mtime):
+                    counts['unchanged'] += 1
+                    continue
+                self.add(path, checksum=checksums.get(name))
+                counts['added'] += 1
+        missing = [path for path in known if path not in seen]
+        with self._lock, self._conn:
+            self._conn.executemany('DELETE FROM granules WHERE path = ?', [(path,) for path in missing])
+        counts['removed'] = len(missing)
+        logger.info(f"扫描{directory}: 新增/更新{counts['added']}个，未变化{counts['unchanged']}个，删除{counts['removed']}个")
+        return counts
+
+    def close(self):
+        """关闭数据库连接"""
+        with self._lock:
+            self._conn.close()
+
+
+def _manifest_checksums(directory):
+    """读取目录中下载清单记录的校验值 {文件名: 校验值}，没有清单时返回空字典"""
+    manifest_path = os.path.join(directory, _MANIFEST_FILE)
+    if not os.path.exists(manifest_path):
+        return {}
+    try:
+        conn = sqlite3.connect(f'file:{manifest_path}?mode=ro', uri=True)
+        try:
+            return {filename: checksum for filename, checksum in
+                    conn.execute('SELECT filename, checksum FROM files WHERE checksum IS NOT NULL')}
+        finally:
+            conn.close()
+    except sqlite3.Error as e:
+        logger.warning(f"读取下载清单失败: {str(e)}")
+        return {}
+
+
+def _format_size(size):
+    return f"{(size or 0) / 1024 / 1024:.1f} MB"
+
+
+def main():
+    from config_handler import ConfigHandler
+
+    parser = argparse.ArgumentParser(description='已下载HDF文件的本地目录')
+    parser.add_argument('--catalog', default='', help='目录文件路径（默认使用配置 catalog_file）')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    p = subparsers.add_parser('query', help='按卫星、仪器、产品和观测时间范围查询')
+    p.add_argument('--satellite', help='如 FY3D')
+    p.add_argument('--instrument', help='如 MERSI')
+    p.add_argument('--product', help='如 1000M、GEO1K')
+    p.add_argument('--region', help='如 GBAL')
+    p.add_argument('--start', help='观测时间下限，如 "2025-10-07 03:00"')
+    p.add_argument('--end', help='观测时间上限（含），如 "2025-10-07 06:00"')
+    p.add_argument('--limit', type=int, help='最多列出的文件数')
+    p.add_argument('--paths', action='store_true', help='只输出文件路径（便于交给其他程序处理）')
+
+    p = subparsers.add_parser('rebuild', help='增量扫描目录，补录已有文件')
+    p.add_argument('directories', nargs='*', help='要扫描的目录（默认为配置的下载目录和HTTP下载目录FY4B_Downloads）')
+
+    subparsers.add_parser('stats', help='按卫星、仪器、产品统计')
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    config = ConfigHandler()
+    catalog = GranuleCatalog(args.catalog or config.get_catalog_file())
+    try:
+        if args.command == 'query':
+            rows = catalog.query(args.satellite, args.instrument, args.product, args.region,
+                                 args.start, args.end, args.limit)
+            for row in rows:
+                if args.paths:
+                    print(row['path'])
+                else:
+                    print(f"{row['observed_at'] or '-':16}  {row['filename']}  {_format_size(row['size'])}  {row['path']}")
+            if not args.paths:
+                print(f"共{len(rows)}个文件，{_format_size(sum(row['size'] or 0 for row in rows))}")
+        elif args.command == 'rebuild':
+            for directory in args.directories or [config.get_download_dir(), config.get_http_download_dir()]:
+                if os.path.isdir(directory):
+                    catalog.rebuild(directory)
+                else:
+                    logger.info(f"目录不存在，跳过: {directory}")
+        else:
+            for row in catalog.stats():
+                print(f"{row['satellite'] or '-'} {row['instrument'] or '-'} {row['product'] or '-'}: "
+                      f"{row['files']}个文件，{_format_size(row['bytes'])}，{row['first']} ~ {row['last']}")
+    finally:
+        catalog.close()
+
+
+if __name__ == '__main__':
+    main()
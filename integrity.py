@@ -0,0 +1,124 @@
+# integrity.py
+import hashlib
+import logging
+import os
+import struct
+
+try:
+    import xxhash  # 可选依赖：比md5/sha256快得多
+except ImportError:
+    xxhash = None
+
+logger = logging.getLogger(__name__)
+
+# HDF5文件签名，超级块可能位于文件偏移 0、512、1024、2048 ... 处
+HDF5_SIGNATURE = b'\x89HDF\r\n\x1a\n'
+
+
+class StreamingHasher:
+    """边写入边计算校验和，下载完成时即可得到结果，无需再读一遍文件"""
+    def __init__(self, algorithm='md5'):
+        self.algorithm = algorithm.lower()
+        if self.algorithm.startswith('xxh') and xxhash is None:
+            logger.warning("未安装xxhash，校验算法改用md5")
+            self.algorithm = 'md5'
+        self.reset()
+
+    def reset(self):
+        """清空状态（从头下载时调用）"""
+        if self.algorithm.startswith('xxh'):
+            self._hash = getattr(xxhash, self.algorithm)()
+        else:
+            self._hash = hashlib.new(self.algorithm)
+
+    def update(self, data):
+        """追加一块数据"""
+        self._hash.update(data)
+
+    def seed_from_file(self, path, length, block_size=1024 * 1024):
+        """续传时先把本地已有的前length字节计入校验和（只读取已有部分）"""
+        self.reset()
+        remaining = length
+        with open(path, 'rb') as f:
+            while remaining > 0:
+                block = f.read(min(block_size, remaining))
+                if not block:
+                    break
+                self._hash.update(block)
+                remaining -= len(block)
+
+    def hexdigest(self):
+        """返回 "算法:十六进制值" 形式的校验和"""
+        return f"{self.algorithm}:{self._hash.hexdigest()}"
+
+
+def check_hdf5_header(path):
+    """
+    HDF5签名和超级块检查：只读取文件头部几百字节
+    超级块中记录了文件结束地址，文件被截断时实际大小会小于该地址
+    Returns:
+    (是否通过, 说明)
+    """
+    file_size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        offset = 0
+        while offset + len(HDF5_SIGNATURE) <= file_size:
+            f.seek(offset)
+            header = f.read(96)
+            if header.startswith(HDF5_SIGNATURE):
+                break
+            offset = 512 if offset == 0 else offset * 2
+        else:
+            return False, '未找到HDF5文件签名'
+
+    version = header[8]
+    if version in (0, 1):
+        size_of_offsets = header[13]
+        # 版本0/1：固定字段之后依次为 基地址、空闲空间地址、文件结束地址、驱动信息地址
+        fields_start = 24 if version == 0 else 28
+    elif version in (2, 3):
+        size_of_offsets = header[9]
+        # 版本2/3：签名、版本、偏移量大小、长度大小、标志之后依次为 基地址、扩展地址、文件结束地址
+        fields_start = 12
+    else:
+        return False, f'未知的超级块版本: {version}'
+
+    if size_of_offsets not in (2, 4, 8):
+        return False, f'超级块偏移量大小异常: {size_of_offsets}'
+
+    fmt = {2: '<H', 4: '<I', 8: '<Q'}[size_of_offsets]
+    eof_start = fields_start + 2 * size_of_offsets
+    if len(header) < eof_start + size_of_offsets:
+        return False, '超级块不完整'
+    # 文件结束地址即完整文件的大小（包含用户块）
+    expected_size = struct.unpack(fmt, header[eof_start:eof_start + size_of_offsets])[0]
+    if expected_size > file_size:
+        return False, f'文件被截断: 超级块记录{expected_size}字节，实际{file_size}字节'
+    return True, f'HDF5超级块版本{version}'
+
+
+def verify_download(path, expected_size=None, expected_checksum=None, actual_checksum=None):
+    """
+    下载完成后的完整性检查：大小、校验和（都在下载过程中得到，不重读文件）、HDF5文件头
+    Args:
+    expected_checksum: 门户提供的校验和（"算法:值" 或只有值），没有时传None
+    actual_checksum: StreamingHasher.hexdigest() 的结果
+    Returns:
+    (是否通过, 说明)
+    """
+    file_size = os.path.getsize(path)
+    if expected_size and file_size != expected_size:
+        return False, f'文件大小不符: 期望{expected_size}字节，实际{file_size}字节'
+
+    if expected_checksum and actual_checksum:
+        expected_value = expected_checksum.split(':')[-1].lower()
+        actual_value = actual_checksum.split(':')[-1].lower()
+        if expected_value != actual_value:
+            return False, f'校验和不符: 期望{expected_checksum}，实际{actual_checksum}'
+
+    if path.upper().endswith(('.HDF', '.H5', '.HDF5')):
+        ok, message = check_hdf5_header(path)
+        if not ok:
+            return False, message
+
+    return True, '完整性检查通过'
@@ -0,0 +1,128 @@
+# link_extractor.py
+"""
+从链接文件、<pre>文本或页面源码中提取HDF下载链接，并解析风云卫星文件名
+    FY3D_MERSI_GBAL_L1_20251013_0500_GEO1K_MS.HDF
+    → 卫星FY3D、仪器MERSI、区域GBAL、级别L1、日期20251013、时间0500、产品GEO1K、单位MS
+"""
+import os
+import re
+from datetime import datetime
+from urllib.parse import unquote, urlparse
+
+# 链接路径和参数中允许的字符：不含空白、引号、括号和全角标点，相邻的链接不会连成一个；
+# 参数不以句号、逗号等结尾，紧跟在链接后面的标点不计入链接
+_PATH = r"[A-Za-z0-9\-._~%!$&*+=:@/]+"
+_QUERY = r"\?[A-Za-z0-9\-._~%!$&*+=:@/,;?]*[A-Za-z0-9\-_~%$&*+=/]"
+
+# HTTP(S)链接（可带?AccessKey=...等参数）和FTP链接（可带 user:pass@）一次扫描同时匹配
+_LINK_PATTERN = re.compile(
+    rf'(?P<http>https?://{_PATH}\.HDF(?:{_QUERY})?)'
+    rf'|(?P<ftp>ftp://(?:[^\s:@/]+:[^\s:@/]+@)?[^\s/"\'<>]+/{_PATH}\.HDF)',
+    re.IGNORECASE
+)
+
+# 风云三号：FY3D_MERSI_GBAL_L1_20251013_0500_GEO1K_MS.HDF
+_FY3_NAME = re.compile(
+    r'^(?P<satellite>FY3[A-Z])_(?P<instrument>[A-Z0-9]+)_(?P<region>[A-Z0-9]+)_(?P<level>L\d[A-Z0-9]*)_'
+    r'(?P<date>\d{8})_(?P<time>\d{4})_(?P<product>[A-Z0-9]+)_(?P<unit>[A-Z0-9]+)\.HDF$',
+    re.IGNORECASE
+)
+# 风云四号：FY4B-_AGRI--_N_DISK_1330E_L1-_FDI-_MULT_NOM_20251013000000_20251013001459_4000M_V0001.HDF
+_FY4_NAME = re.compile(
+    r'^(?P<satellite>FY4[A-Z])-*_(?P<instrument>[A-Z0-9]+)-*_[A-Z]_(?P<region>[A-Z0-9]+)_[A-Z0-9]+_'
+    r'(?P<level>L\d[A-Z0-9]*)-*_(?P<kind>[A-Z0-9]+)-*_[A-Z0-9]+_[A-Z0-9]+_(?P<date>\d{8})(?P<time>\d{4})\d{2}_\d{14}_'
+    r'(?P<product>[A-Z0-9]+)_(?P<unit>[A-Z0-9]+)\.HDF$',
+    re.IGNORECASE
+)
+
+
+class GranuleRecord:
+    """一个HDF文件的链接和文件名解析结果（无法解析的文件名各字段为None）"""
+    __slots__ = ('url', 'protocol', 'filename', 'satellite', 'instrument', 'region', 'level',
+                 'date', 'time', 'product', 'unit')
+
+    def __init__(self, url, protocol, filename, satellite=None, instrument=None, region=None, level=None,
+                 date=None, time=None, product=None, unit=None):
+        self.url = url
+        self.protocol = protocol      # 'http' 或 'ftp'（下载引擎的任务类型）
+        self.filename = filename
+        self.satellite = satellite    # FY3D
+        self.instrument = instrument  # MERSI
+        self.region = region          # GBAL
+        self.level = level            # L1
+        self.date = date              # 20251013
+        self.time = time              # 0500（UTC）
+        self.product = product        # GEO1K / 1000M / 030KM 等分辨率或产品
+        self.unit = unit              # 文件名最后一段：风云三号为MS，风云四号为版本号（V0001）
+
+    @classmethod
+    def from_url(cls, url, protocol):
+        filename = os.path.basename(unquote(urlparse(url).path))
+        fields = parse_granule_name(filename) or {}
+        return cls(url, protocol, filename, **fields)
+
+    @property
+    def parsed(self):
+        return self.satellite is not None
+
+    @property
+    def task(self):
+        """下载引擎的任务 (协议, 链接)"""
+        return self.protocol, self.url
+
+    @property
+    def observed_at(self):
+        """观测时间（datetime），文件名无法解析时为None"""
+        if not self.parsed:
+            return None
+        return datetime.strptime(self.date + self.time, '%Y%m%d%H%M')
+
+    @property
+    def scene_key(self):
+        """同一景的标识（卫星、仪器、区域、日期、时间），用于配对同一景的 1000M 和 GEO1K 文件"""
+        return self.satellite, self.instrument, self.region, self.date, self.time
+
+    def __repr__(self):
+        return f"GranuleRecord({self.filename!r}, protocol={self.protocol!r})"
+
+
+def parse_granule_name(filename):
+    """解析风云卫星文件名，返回各字段的字典（大写），不符合命名规则时返回None"""
+    match = _FY3_NAME.match(filename) or _FY4_NAME.match(filename)
+    if not match:
+        return None
+    fields = match.groupdict()
+    fields.pop('kind', None)
+    return {key: value.upper() for key, value in fields.items()}
+
+
+def strip_credentials(url):
+    """去掉链接中的用户名和密码（订单的FTP账号不写入清单和目录）"""
+    if not url:
+        return url
+    parsed = urlparse(url)
+    if '@' not in parsed.netloc:
+        return url
+    return parsed._replace(netloc=parsed.netloc.rsplit('@', 1)[1]).geturl()
+
+
+def extract_links(text):
+    """
+    一次扫描提取文本中的HDF链接并去重（保持出现顺序）
+    Returns:
+    [(协议, 链接), ...]，可直接作为下载引擎的任务
+    """
+    tasks = []
+    seen = set()
+    for match in _LINK_PATTERN.finditer(text):
+        url = match.group(0)
+        if url in seen:
+            continue
+        seen.add(url)
+        tasks.append(('http' if match.lastgroup == 'http' else 'ftp', url))
+    return tasks
+
+
+def extract_granules(text):
+    """提取并解析文本中的HDF链接，返回 [GranuleRecord, ...]"""
+    return [GranuleRecord.from_url(url, protocol) for protocol, url in extract_links(text)]
@@ -0,0 +1,80 @@
+# order_index.py
+import logging
+import os
+import sqlite3
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+DONE = 'done'        # 订单的文件已全部下载
+FAILED = 'failed'    # 读取链接或下载失败，下次运行重试
+
+
+class ProcessedOrderIndex:
+    """已处理订单索引：记录每个订单的处理结果，订单收割时跳过已处理的订单"""
+    def __init__(self, path, max_attempts=3):
+        """
+        Args:
+        path: 索引文件路径（SQLite）
+        max_attempts: 一个订单最多尝试的运行次数，超过后不再处理（如链接已过期的旧订单）
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path)
+        self._conn.row_factory = sqlite3.Row
+        with self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS orders (
+                       order_id   TEXT PRIMARY KEY,
+                       order_time TEXT,
+                       status     TEXT,
+                       file_count INTEGER,
+                       attempts   INTEGER,
+                       error      TEXT,
+                       updated_at TEXT
+                   )'''
+            )
+
+    def get(self, order_id):
+        """查询订单的处理记录，没有记录时返回None"""
+        row = self._conn.execute('SELECT * FROM orders WHERE order_id = ?', (order_id,)).fetchone()
+        return dict(row) if row else None
+
+    def pending(self, orders):
+        """从订单列表中选出需要处理的订单：已处理完成（有文件按钮）、没有下载完成、尝试次数未用完"""
+        result = []
+        for order in orders:
+            if not order.get('ready') or not order.get('order_id'):
+                continue
+            entry = self.get(order['order_id'])
+            if entry is None:
+                result.append(order)
+            elif entry['status'] != DONE and entry['attempts'] < self.max_attempts:
+                result.append(order)
+        return result
+
+    def _save(self, order, status, file_count, error):
+        entry = self.get(order['order_id'])
+        attempts = (entry['attempts'] if entry else 0) + 1
+        with self._conn:
+            self._conn.execute(
+                '''INSERT OR REPLACE INTO orders
+                   (order_id, order_time, status, file_count, attempts, error, updated_at)
+                   VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                (order['order_id'], order.get('order_time'), status, file_count, attempts, error,
+                 datetime.now().isoformat(timespec='seconds'))
+            )
+        if status == FAILED and attempts >= self.max_attempts:
+            logger.warning(f"订单{order['order_id']}已尝试{attempts}次仍未完成，之后不再处理")
+
+    def mark_done(self, order, file_count):
+        """订单的文件全部下载完成"""
+        self._save(order, DONE, file_count, None)
+
+    def mark_failed(self, order, error, file_count=0):
+        """订单处理失败（没有链接或部分文件下载失败），下次运行重试"""
+        self._save(order, FAILED, file_count, error)
+
+    def close(self):
+        self._conn.close()
@@ -0,0 +1,164 @@
+# page_waits.py
+import logging
+import time
+
+from tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+
+class By:
+    """
+    元素定位方式，取值与 selenium.webdriver.common.by.By 相同
+    导入 selenium.webdriver 会加载所有浏览器驱动模块，定位符只需要这些字符串
+    """
+    ID = 'id'
+    XPATH = 'xpath'
+    LINK_TEXT = 'link text'
+    PARTIAL_LINK_TEXT = 'partial link text'
+    NAME = 'name'
+    TAG_NAME = 'tag name'
+    CLASS_NAME = 'class name'
+    CSS_SELECTOR = 'css selector'
+
+# 在页面中统计未完成的XHR/fetch请求（每个页面只安装一次），并返回是否空闲
+# jQuery.active 只统计jQuery发出的请求，计数器可以覆盖其余的请求
+_AJAX_IDLE_JS = """
+if (!window.__fyRequestMonitor) {
+    window.__fyRequestMonitor = true;
+    window.__fyPendingRequests = 0;
+    var done = function () { window.__fyPendingRequests = Math.max(0, window.__fyPendingRequests - 1); };
+    var send = XMLHttpRequest.prototype.send;
+    XMLHttpRequest.prototype.send = function () {
+        window.__fyPendingRequests++;
+        this.addEventListener('loadend', done);
+        return send.apply(this, arguments);
+    };
+    if (window.fetch) {
+        var fetch = window.fetch;
+        window.fetch = function () {
+            window.__fyPendingRequests++;
+            return fetch.apply(this, arguments).finally(done);
+        };
+    }
+}
+return document.readyState !== 'loading'
+    && (!window.jQuery || window.jQuery.active === 0)
+    && window.__fyPendingRequests === 0;
+"""
+
+# 用JS查询元素状态：不经过find_element，避免每次轮询都被隐式等待拖住
+_QUERY_JS = """
+var by = arguments[0], value = arguments[1], mode = arguments[2];
+var nodes = [];
+if (by === 'xpath') {
+    var result = document.evaluate(value, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var i = 0; i < result.snapshotLength; i++) nodes.push(result.snapshotItem(i));
+} else if (by === 'id') {
+    var node = document.getElementById(value);
+    if (node) nodes.push(node);
+} else {
+    nodes = Array.prototype.slice.call(document.querySelectorAll(value));
+}
+if (mode === 'count') return nodes.length;
+if (mode === 'visible') {
+    return nodes.some(function (n) { return n.getClientRects().length > 0
+        && window.getComputedStyle(n).visibility !== 'hidden'; });
+}
+if (mode === 'src') return nodes.length ? nodes[0].src : null;
+if (mode === 'image') return nodes.length > 0 && nodes[0].complete && nodes[0].naturalWidth > 0;
+return null;
+"""
+
+
+class PageWaiter:
+    """
+    基于页面状态的等待：代替固定的time.sleep，条件满足就立即继续
+    - 短间隔轮询（poll_frequency），超过上限（timeout）时记录警告并继续执行，
+      后面的safe_click_element等仍有自己的显式等待兜底
+    - 每次等待的实际耗时写入日志和时间线（tracing）
+    """
+    def __init__(self, driver, timeout=10, poll_frequency=0.1, quiet_period=0.2):
+        """
+        Args:
+        timeout: 每次等待的上限（秒）
+        poll_frequency: 轮询间隔（秒）
+        quiet_period: 判定网络空闲前需要持续空闲的时间（秒），避免点击后请求还没发出就判定为空闲
+        """
+        self.driver = driver
+        self.timeout = timeout
+        self.poll_frequency = poll_frequency
+        self.quiet_period = quiet_period
+
+    def until(self, condition, description, timeout=None):
+        """
+        等待condition(driver)返回真值
+        Returns:
+        条件是否在上限时间内满足
+        """
+        from selenium.common.exceptions import TimeoutException, WebDriverException
+        from selenium.webdriver.support.ui import WebDriverWait  # 较重的模块，用到时才导入
+        timeout = self.timeout if timeout is None else timeout
+        start = time.perf_counter()
+        with tracer.span(description, cat='wait', timeout=timeout) as span_args:
+            try:
+                WebDriverWait(self.driver, timeout, poll_frequency=self.poll_frequency,
+                              ignored_exceptions=(WebDriverException,)).until(condition)
+                span_args['ok'] = True
+            except TimeoutException:
+                span_args['ok'] = False
+        elapsed = time.perf_counter() - start
+        if span_args['ok']:
+            logger.info(f"等待{description}: {elapsed:.2f}秒")
+        else:
+            logger.warning(f"等待{description}超时（{timeout}秒），继续执行")
+        return span_args['ok']
+
+    def _query(self, locator, mode):
+        by, value = locator
+        return self.driver.execute_script(_QUERY_JS, by, value, mode)
+
+    def ajax_idle(self, description='网络请求完成', timeout=None):
+        """等待页面加载完成且没有进行中的XHR/fetch/jQuery请求，并持续空闲quiet_period秒"""
+        state = {'busy_at': time.perf_counter()}
+
+        def idle(driver):
+            now = time.perf_counter()
+            if not driver.execute_script(_AJAX_IDLE_JS):
+                state['busy_at'] = now
+                return False
+            return now - state['busy_at'] >= self.quiet_period
+
+        return self.until(idle, description, timeout)
+
+    def page_ready(self, description='页面加载完成', timeout=None):
+        """driver.get之后调用：等待文档加载和初始请求完成"""
+        return self.ajax_idle(description, timeout)
+
+    def present(self, locator, description, min_count=1, timeout=None):
+        """等待至少min_count个匹配元素出现（如结果表格的行）"""
+        return self.until(lambda driver: self._query(locator, 'count') >= min_count, description, timeout)
+
+    def visible(self, locator, description, timeout=None):
+        """等待元素可见（如弹窗）"""
+        return self.until(lambda driver: self._query(locator, 'visible'), description, timeout)
+
+    def invisible(self, locator, description, timeout=None):
+        """等待元素消失或隐藏（如弹窗关闭）"""
+        return self.until(lambda driver: not self._query(locator, 'visible'), description, timeout)
+
+    def image_src(self, locator):
+        """读取图片当前的src（刷新验证码前记录，用于判断是否已换图）"""
+        from selenium.common.exceptions import WebDriverException
+        try:
+            return self._query(locator, 'src')
+        except WebDriverException:
+            return None
+
+    def image_reloaded(self, locator, old_src, description='验证码图片刷新', timeout=None):
+        """等待图片src变化（old_src为None时不比较）且新图片加载完成"""
+        return self.until(
+            lambda driver: (old_src is None or self._query(locator, 'src') != old_src)
+            and self._query(locator, 'image'),
+            description, timeout
+        )
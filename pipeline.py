@@ -0,0 +1,276 @@
+# pipeline.py
+"""
+下载 → 校验 → 后处理 流水线：文件下载完成后立即交给校验线程，校验通过的文件按景配对
+（如 MERSI 的 1000M 和 GEO1K），一景的文件到齐后马上交给进程池后处理，下载和计算同时进行
+后处理函数见配置 [PIPELINE] post_processor（"模块:函数"），函数接收 (files, scene)：
+    files: {产品: 文件路径}，如 {'1000M': '.../FY3D_..._1000M_MS.HDF', 'GEO1K': '.../FY3D_..._GEO1K_MS.HDF'}
+    scene: 景的名称，如 'FY3D_MERSI_GBAL_20251013_0500'
+    返回值（字符串）记入日志
+处理成功的景记录在 [PIPELINE] state_file 中，输入文件没有变化时不再重复处理（重新运行、跳过已下载的文件时）
+用法（处理已经下载的文件，--reprocess 忽略处理记录）：
+    python pipeline.py [--reprocess] [目录或文件 ...]
+"""
+import argparse
+import importlib
+import logging
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from integrity import verify_download
+from link_extractor import parse_granule_name
+
+logger = logging.getLogger(__name__)
+
+_DONE = object()  # 校验队列的结束标记
+
+
+def load_processor(spec):
+    """按 "模块:函数" 导入后处理函数（函数必须定义在模块顶层，才能交给子进程执行）"""
+    module_name, _, function_name = spec.partition(':')
+    if not function_name:
+        raise ValueError(f"后处理函数应写成 模块:函数，实际为: {spec}")
+    return getattr(importlib.import_module(module_name.strip()), function_name.strip())
+
+
+class ProcessedSceneIndex:
+    """
+    已处理景的记录：同一后处理函数、同一景的同一组产品，输入文件（文件名、大小、修改时间）没有变化时只处理一次
+    """
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()  # 校验线程查询，进程池回调线程写入
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._conn:
+            self._conn.execute(
+                '''CREATE TABLE IF NOT EXISTS scenes (
+                       processor    TEXT,
+                       scene        TEXT,
+                       products     TEXT,
+                       signature    TEXT,
+                       processed_at TEXT,
+                       PRIMARY KEY (processor, scene, products)
+                   )'''
+            )
+
+    @staticmethod
+    def signature(files):
+        """输入文件的特征：重新下载或替换了文件时特征改变，需要重新处理"""
+        parts = []
+        for product, path in sorted(files.items()):
+            stat = os.stat(path)
+            parts.append(f"{product}={os.path.basename(path)}:{stat.st_size}:{stat.st_mtime_ns}")
+        return ';'.join(parts)
+
+    def is_done(self, processor, scene, files):
+        """这一景是否已经用同样的输入处理过"""
+        try:
+            signature = self.signature(files)
+        except OSError:
+            return False
+        with self._lock:
+            row = self._conn.execute('SELECT signature FROM scenes WHERE processor = ? AND scene = ? AND products = ?',
+                                     (processor, scene, ','.join(sorted(files)))).fetchone()
+        return row is not None and row[0] == signature
+
+    def mark_done(self, processor, scene, files):
+        """记录处理成功的景（输入文件已被删除时记录为空特征）"""
+        try:
+            signature = self.signature(files)
+        except OSError:
+            signature = ''
+        with self._lock, self._conn:
+            self._conn.execute('INSERT OR REPLACE INTO scenes VALUES (?, ?, ?, ?, ?)',
+                               (processor, scene, ','.join(sorted(files)), signature,
+                                datetime.now().isoformat(timespec='seconds')))
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class ProcessingPipeline:
+    """
+    三个阶段之间用有界队列连接：
+        下载线程 --put()--> 校验队列 --> 校验/配对线程 --> 进程池（同时处理的景数有上限）
+    队列满时 put() 会阻塞，后处理跟不上时下载自然放慢，内存占用不会无限增长
+    """
+    def __init__(self, processor, max_workers=2, queue_size=8, pair_products=('1000M', 'GEO1K'),
+                 scene_index=None, reprocess=False):
+        """
+        Args:
+        processor: 后处理函数（模块顶层函数），为None时只校验不处理
+        max_workers: 后处理进程数
+        queue_size: 校验队列长度，以及已提交但未处理完的景数上限
+        pair_products: 需要配对的产品，同一景的这些产品都到齐后才处理；其他产品的文件单独处理
+        scene_index: ProcessedSceneIndex，传入时跳过已处理过的景，处理成功后记录（close时关闭）
+        reprocess: 为True时忽略处理记录，全部重新处理
+        """
+        self.processor = processor
+        self.processor_name = f"{processor.__module__}:{processor.__name__}" if processor is not None else ''
+        self.scene_index = scene_index
+        self.reprocess = reprocess
+        self.max_workers = max(1, int(max_workers))
+        self.pair_products = tuple(product.upper() for product in pair_products)
+        self._verify_queue = queue.Queue(maxsize=queue_size)
+        self._slots = threading.BoundedSemaphore(queue_size)
+        self._pending_pairs = {}  # 景 → {产品: 路径}，等待另一半
+        self._lock = threading.Lock()
+        self._executor = None
+        self._thread = None
+        self.summary = {'verified': 0, 'invalid': 0, 'processed': 0, 'failed': 0, 'unpaired': 0, 'skipped': 0}
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def start(self):
+        if self.processor is not None:
+            self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+        self._thread = threading.Thread(target=self._verify_loop, name='pipeline-verify', daemon=True)
+        self._thread.start()
+
+    def put(self, path, checksum=None):
+        """下载完成的文件进入流水线（在下载线程中调用，队列满时等待）"""
+        self._verify_queue.put((path, checksum))
+
+    def close(self):
+        """
+        所有文件都已 put 后调用：等待校验和后处理完成
+        Returns:
+        {'verified', 'invalid', 'processed', 'failed', 'unpaired', 'skipped'} 各阶段计数
+        """
+        self._verify_queue.put(_DONE)
+        self._thread.join()
+        for scene, files in self._pending_pairs.items():
+            missing = [product for product in self.pair_products if product not in files]
+            logger.warning(f"{scene} 缺少 {'/'.join(missing)}，不处理")
+            self.summary['unpaired'] += 1
+        self._pending_pairs.clear()
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+        if self.scene_index is not None:
+            self.scene_index.close()
+        logger.info(f"流水线完成: 校验通过{self.summary['verified']}个，未通过{self.summary['invalid']}个；"
+                    f"后处理成功{self.summary['processed']}景，失败{self.summary['failed']}景，"
+                    f"缺少配对{self.summary['unpaired']}景，已处理过{self.summary['skipped']}景")
+        return dict(self.summary)
+
+    def _verify_loop(self):
+        """校验线程：检查HDF5文件头，按景配对，到齐后提交后处理"""
+        while True:
+            item = self._verify_queue.get()
+            if item is _DONE:
+                return
+            path, checksum = item
+            try:
+                ok, message = verify_download(path, actual_checksum=checksum)
+            except OSError as e:
+                ok, message = False, str(e)
+            if not ok:
+                logger.error(f"校验未通过，不进行后处理: {path}（{message}）")
+                self.summary['invalid'] += 1
+                continue
+            self.summary['verified'] += 1
+            try:
+                self._route(path)
+            except Exception as e:
+                # 校验线程不能退出，否则下载线程会阻塞在已满的队列上
+                logger.error(f"提交后处理失败 {path}: {str(e)}")
+                with self._lock:
+                    self.summary['failed'] += 1
+
+    def _route(self, path):
+        """按景配对：配对产品等另一半到齐，其他文件直接处理"""
+        fields = parse_granule_name(os.path.basename(path))
+        if not fields:
+            self._submit(os.path.splitext(os.path.basename(path))[0], {'FILE': path})
+            return
+        scene = '_'.join((fields['satellite'], fields['instrument'], fields['region'], fields['date'], fields['time']))
+        product = fields['product']
+        if product not in self.pair_products:
+            self._submit(scene, {product: path})
+            return
+        files = self._pending_pairs.setdefault(scene, {})
+        files[product] = path
+        if all(p in files for p in self.pair_products):
+            del self._pending_pairs[scene]
+            logger.info(f"{scene} 的 {'/'.join(self.pair_products)} 已到齐，提交后处理")
+            self._submit(scene, files)
+
+    def _submit(self, scene, files):
+        if self._executor is None:
+            return
+        if (self.scene_index is not None and not self.reprocess
+                and self.scene_index.is_done(self.processor_name, scene, files)):
+            logger.info(f"{scene} 已处理过，跳过")
+            self.summary['skipped'] += 1
+            return
+        self._slots.acquire()  # 正在处理的景数达到上限时等待
+        start = time.time()
+        try:
+            future = self._executor.submit(self.processor, files, scene)
+        except Exception:
+            self._slots.release()  # 没有提交成功就不会有回调释放
+            raise
+        future.add_done_callback(lambda f: self._on_processed(f, scene, files, start))
+
+    def _on_processed(self, future, scene, files, start):
+        self._slots.release()
+        try:
+            message = future.result()
+            with self._lock:
+                self.summary['processed'] += 1
+            if self.scene_index is not None:
+                self.scene_index.mark_done(self.processor_name, scene, files)
+            logger.info(f"✅ 后处理完成 {scene}（{time.time() - start:.1f}秒）{': ' + message if message else ''}")
+        except Exception as e:
+            with self._lock:
+                self.summary['failed'] += 1
+            logger.error(f"❌ 后处理失败 {scene}: {str(e)}")
+
+
+def pipeline_from_config(config, reprocess=False):
+    """按配置创建流水线，没有配置后处理函数时返回None"""
+    settings = config.get_pipeline_settings()
+    if not settings['post_processor']:
+        return None
+    scene_index = ProcessedSceneIndex(settings['state_file']) if settings['state_file'] else None
+    return ProcessingPipeline(load_processor(settings['post_processor']), settings['process_workers'],
+                              settings['queue_size'], settings['pair_products'], scene_index, reprocess)
+
+
+def main():
+    from config_handler import ConfigHandler
+
+    parser = argparse.ArgumentParser(description='对已下载的文件运行 校验 → 配对 → 后处理')
+    parser.add_argument('paths', nargs='*', help='文件或目录（默认为配置的下载目录）')
+    parser.add_argument('--reprocess', action='store_true', help='忽略处理记录，已处理过的景也重新处理')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    config = ConfigHandler()
+    pipeline = pipeline_from_config(config, args.reprocess)
+    if pipeline is None:
+        parser.error('配置 [PIPELINE] post_processor 为空，没有要运行的后处理')
+    with pipeline:
+        for path in args.paths or [config.get_download_dir()]:
+            if os.path.isfile(path):
+                pipeline.put(path)
+                continue
+            for root, _, files in os.walk(path):
+                for name in sorted(files):
+                    if name.lower().endswith('.hdf'):
+                        pipeline.put(os.path.join(root, name))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+# portal_client.py
+import logging
+import re
+from urllib.parse import urljoin, urlparse
+
+logger = logging.getLogger(__name__)
+
+# 订单号：文件按钮的onclick/href中的数字或字母数字编号（如 A202510130830070581）
+_ORDER_ID_PATTERN = re.compile(r"['\"(,=]\s*([A-Za-z]?\d{6,})")
+# 订单时间：形如 2025-10-13 08:30:07 的单元格
+_ORDER_TIME_PATTERN = re.compile(r'\d{4}[-/]\d{1,2}[-/]\d{1,2}(?:\s+\d{1,2}:\d{2}(?::\d{2})?)?')
+# 订单表格（只有登录后才有；登录弹窗的标记每个页面都有，不能用来判断会话失效）
+_ORDER_TABLE_PATTERN = re.compile(r'id\s*=\s*["\']?displayOrderBody\b')
+# 会话失效时门户重定向到的登录页
+_LOGIN_PATH_PATTERN = re.compile(r'login|signin', re.IGNORECASE)
+
+
+class PortalSessionExpired(Exception):
+    """保存的会话已失效（重定向到了登录页或没有订单列表）"""
+
+
+def session_expired(response):
+    """订单列表响应是否表示会话已失效：被重定向到登录页，或页面中没有订单表格"""
+    if response.history and _LOGIN_PATH_PATTERN.search(urlparse(response.url).path):
+        return True
+    return not _ORDER_TABLE_PATTERN.search(response.text)
+
+
+def parse_order_rows(html, base_url):
+    """
+    解析"我的订单"页面（或只含表格行的片段）中 displayOrderBody 的每一行
+    Returns:
+    [{'order_id': 订单号, 'row': 第几行（从1开始，对应XPath的tr[n]）, 'ready': 是否有文件按钮（订单处理完成）,
+      'order_time': 订单时间（找不到时为None）, 'cells': 各列文本, 'link_url': 文件按钮的链接（没有时为None）}, ...]
+    找不到订单表格时返回None
+    """
+    from bs4 import BeautifulSoup  # 只有HTTP模式用到，用到时才导入
+    soup = BeautifulSoup(html, 'html.parser')
+    body = soup.find(id='displayOrderBody')
+    rows = body.find_all('tr', recursive=False) if body else soup.find_all('tr')
+    if body is None and not rows:
+        return None
+
+    orders = []
+    for row_number, row in enumerate(rows, start=1):
+        cells = row.find_all('td', recursive=False)
+        if not cells:
+            continue
+        texts = [cell.get_text(strip=True) for cell in cells]
+        # 文件按钮在第8列（与Selenium流程的 td[8]/a 一致）；列数不足时取最后一个链接
+        anchors = row.find_all('a')
+        if len(cells) >= 8:
+            anchor = cells[7].find('a')
+        else:
+            anchor = anchors[-1] if anchors else None
+        link_url = None
+        order_id = texts[0] if texts else ''
+        if anchor is not None:
+            href = anchor.get('href') or ''
+            if href and not href.lower().startswith('javascript') and href != '#':
+                link_url = urljoin(base_url, href)
+            match = _ORDER_ID_PATTERN.search(anchor.get('onclick') or href)
+            if match:
+                order_id = match.group(1)
+        order_time = next((match.group(0) for match in map(_ORDER_TIME_PATTERN.search, texts) if match), None)
+        orders.append({'order_id': order_id, 'row': row_number, 'ready': anchor is not None,
+                       'order_time': order_time, 'cells': texts, 'link_url': link_url})
+    return orders
+
+
+def extract_link_text(body, content_type=''):
+    """链接文件的内容：纯文本直接返回，HTML页面取<pre>中的文本（与Selenium流程相同）"""
+    if 'html' not in content_type.lower() and not body.lstrip().lower().startswith(('<!doctype', '<html')):
+        return body.strip()
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(body, 'html.parser')
+    pre = soup.find('pre')
+    return (pre or soup).get_text().strip()
+
+
+class PortalClient:
+    """
+    不启动浏览器，直接用HTTP请求读取订单列表和链接文件
+    使用Selenium登录时保存的cookies（session_store），会话失效时抛出PortalSessionExpired，
+    由调用方退回到Selenium流程
+    """
+    def __init__(self, order_list_url, link_file_url='', session=None, timeout=30, verify=False):
+        """
+        Args:
+        order_list_url: 订单列表地址（返回含 displayOrderBody 的HTML）
+        link_file_url: 文件按钮没有直接链接时使用的地址模板，如 "https://.../GetOrderFile?orderCode={order_id}"
+        session: requests.Session，默认新建带连接池的会话
+        """
+        # requests/urllib3较重，只有真正使用HTTP客户端模式时才导入
+        import urllib3
+        from download_http_file import create_http_session
+
+        # 门户使用自签名证书，与下载模块一样不校验证书
+        urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
+        self.order_list_url = order_list_url
+        self.link_file_url = link_file_url
+        self.session = session or create_http_session(pool_size=2)
+        self.timeout = timeout
+        self.verify = verify
+
+    @classmethod
+    def from_session_store(cls, store, order_list_url, link_file_url=''):
+        """用保存的登录会话创建客户端，没有可用会话时返回None"""
+        data = store.load()
+        if not data:
+            return None
+        client = cls(order_list_url, link_file_url)
+        client.load_cookies(data['cookies'])
+        return client
+
+    def load_cookies(self, cookies):
+        """导入Selenium格式的cookies（driver.get_cookies() 的结果）"""
+        for cookie in cookies:
+            self.session.cookies.set(cookie['name'], cookie['value'],
+                                     domain=cookie.get('domain', ''), path=cookie.get('path', '/'))
+
+    def _get(self, url):
+        response = self.session.get(url, timeout=self.timeout, verify=self.verify)
+        response.raise_for_status()
+        response.encoding = response.encoding or response.apparent_encoding
+        return response
+
+    def list_orders(self):
+        """读取订单列表（第一行为最新订单）"""
+        response = self._get(self.order_list_url)
+        if session_expired(response):
+            raise PortalSessionExpired('未找到订单列表，会话可能已失效')
+        orders = parse_order_rows(response.text, response.url) or []
+        logger.info(f"读取到{len(orders)}个订单")
+        return orders
+
+    def link_url_for(self, order):
+        """订单的链接文件地址"""
+        if order['link_url']:
+            return order['link_url']
+        if self.link_file_url and order['order_id']:
+            return self.link_file_url.format(order_id=order['order_id'])
+        return None
+
+    def fetch_link_text(self, order):
+        """下载订单的链接文件，返回其中的文本（包含HTTP/FTP下载链接）"""
+        url = self.link_url_for(order)
+        if not url:
+            raise ValueError(f"订单{order['order_id']}没有可用的链接文件地址")
+        response = self._get(url)
+        return extract_link_text(response.text, response.headers.get('Content-Type', ''))
+
+    def latest_link_text(self):
+        """最新订单（订单列表第一行）的链接文件文本，没有订单时返回None"""
+        orders = self.list_orders()
+        if not orders:
+            return None
+        return self.fetch_link_text(orders[0])
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,235 @@
+# roi_subset.py
+"""
+MERSI L1 数据按经纬度范围裁剪：分块读取GEO1K的经纬度，用NumPy计算范围内的像元，
+只把相交的行列窗口写入分块压缩的输出文件（不一次读入整幅数据，内存占用与分块行数成正比）
+作为下载流水线的后处理（配置 [PIPELINE] post_processor = roi_subset:process_granule），
+或单独运行：
+    python roi_subset.py GEO1K文件 1000M文件 [--bbox 纬度下限 纬度上限 经度下限 经度上限] [--datasets ...]
+"""
+import argparse
+import logging
+import os
+import re
+
+logger = logging.getLogger(__name__)
+
+# 数据集写法：路径，或 路径[波段序号,...]（从0开始，只用于三维数据集的第一维）
+_DATASET_SPEC = re.compile(r'^\s*(?P<path>[^\[\]]+?)\s*(?:\[(?P<bands>[\d,\s-]+)\])?\s*$')
+
+
+def parse_dataset_spec(spec):
+    """'Data/EV_1KM_RefSB[0,2-4]' → ('Data/EV_1KM_RefSB', [0, 2, 3, 4])；没有波段时为None"""
+    match = _DATASET_SPEC.match(spec)
+    if not match:
+        raise ValueError(f"无法识别的数据集: {spec}")
+    bands = None
+    if match.group('bands'):
+        bands = []
+        for part in match.group('bands').split(','):
+            part = part.strip()
+            if '-' in part:
+                first, last = part.split('-')
+                bands.extend(range(int(first), int(last) + 1))
+            elif part:
+                bands.append(int(part))
+        bands = sorted(set(bands))
+    return match.group('path'), bands
+
+
+def roi_window(lat, lon, bbox, chunk_rows=256):
+    """
+    分块读取经纬度，计算范围内像元所在的行列窗口
+    Args:
+    lat/lon: h5py数据集（或数组），形状 (行, 列)
+    bbox: (纬度下限, 纬度上限, 经度下限, 经度上限)；经度下限大于上限表示跨越180°经线
+    Returns:
+    (起始行, 结束行, 起始列, 结束列, 范围内像元数)，结束位置不含；没有像元在范围内时返回None
+    """
+    import numpy as np
+
+    rows, cols = lat.shape
+    row_min = row_max = None
+    col_any = np.zeros(cols, dtype=bool)
+    count = 0
+    for start in range(0, rows, chunk_rows):
+        stop = min(start + chunk_rows, rows)
+        mask = roi_mask(lat[start:stop], lon[start:stop], bbox)
+        row_any = mask.any(axis=1)
+        if not row_any.any():
+            continue
+        hit_rows = np.flatnonzero(row_any)
+        row_min = start + hit_rows[0] if row_min is None else row_min
+        row_max = start + hit_rows[-1]
+        col_any |= mask.any(axis=0)
+        count += int(mask.sum())
+    if row_min is None:
+        return None
+    hit_cols = np.flatnonzero(col_any)
+    return int(row_min), int(row_max) + 1, int(hit_cols[0]), int(hit_cols[-1]) + 1, count
+
+
+def roi_mask(lat, lon, bbox):
+    """一块经纬度数组中落在范围内的像元（填充值等超出合理范围的像元为False）"""
+    import numpy as np
+
+    lat_min, lat_max, lon_min, lon_max = bbox
+    lat = np.asarray(lat, dtype=np.float32)
+    lon = np.asarray(lon, dtype=np.float32)
+    mask = (lat >= lat_min) & (lat <= lat_max) & (np.abs(lon) <= 180)
+    if lon_min <= lon_max:
+        mask &= (lon >= lon_min) & (lon <= lon_max)
+    else:
+        mask &= (lon >= lon_min) | (lon <= lon_max)
+    return mask
+
+
+def _copy_window(source, target_group, name, window, bands=None, chunk_rows=256, compression_level=4):
+    """把数据集的行列窗口分块复制到输出文件（分块、gzip压缩），保留属性（如定标系数）"""
+    row_start, row_stop, col_start, col_stop = window
+    rows, cols = row_stop - row_start, col_stop - col_start
+    chunk_rows = min(chunk_rows, rows)
+    if source.ndim == 3:
+        bands = list(range(source.shape[0])) if bands is None else bands
+        shape, chunks = (len(bands), rows, cols), (1, chunk_rows, min(256, cols))
+    elif source.ndim == 2:
+        shape, chunks = (rows, cols), (chunk_rows, min(256, cols))
+    else:
+        raise ValueError(f"{source.name} 不是二维或三维数据集")
+    target = target_group.create_dataset(name, shape=shape, dtype=source.dtype, chunks=chunks,
+                                         compression='gzip', compression_opts=compression_level, shuffle=True)
+    for start in range(row_start, row_stop, chunk_rows):
+        stop = min(start + chunk_rows, row_stop)
+        if source.ndim == 3:
+            target[:, start - row_start:stop - row_start, :] = source[bands, start:stop, col_start:col_stop]
+        else:
+            target[start - row_start:stop - row_start, :] = source[start:stop, col_start:col_stop]
+    for key, value in source.attrs.items():
+        target.attrs[key] = value
+    if bands is not None and source.ndim == 3:
+        target.attrs['source_bands'] = bands
+
+
+def subset_granule(geo_path, data_path, output_path, bbox, datasets, lat_dataset='Geolocation/Latitude',
+                   lon_dataset='Geolocation/Longitude', chunk_rows=256, compression_level=4):
+    """
+    裁剪一景数据
+    Args:
+    geo_path: GEO1K文件（经纬度）
+    data_path: 1000M文件（观测数据）
+    datasets: 要保留的数据集，见 parse_dataset_spec
+    Returns:
+    写入的 (起始行, 结束行, 起始列, 结束列, 范围内像元数)；不在范围内时返回None，不生成文件
+    """
+    import h5py
+
+    with h5py.File(geo_path, 'r') as geo:
+        lat, lon = geo[lat_dataset], geo[lon_dataset]
+        window = roi_window(lat, lon, bbox, chunk_rows)
+        if window is None:
+            return None
+        row_start, row_stop, col_start, col_stop, _ = window
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_path)), exist_ok=True)
+        temp_path = output_path + '.part'  # 写完再改名，避免留下不完整的文件
+        with h5py.File(data_path, 'r') as data, h5py.File(temp_path, 'w') as out:
+            for key, value in data.attrs.items():
+                out.attrs[key] = value
+            out.attrs['roi_bbox'] = bbox
+            out.attrs['roi_window'] = (row_start, row_stop, col_start, col_stop)  # 在原始数据中的位置
+            out.attrs['source_files'] = [os.path.basename(geo_path), os.path.basename(data_path)]
+            for path, source in ((lat_dataset, lat), (lon_dataset, lon)):
+                _copy_window(source, out, path, window[:4], chunk_rows=chunk_rows,
+                             compression_level=compression_level)
+            for spec in datasets:
+                path, bands = parse_dataset_spec(spec)
+                if path not in data:
+                    logger.warning(f"{os.path.basename(data_path)} 中没有数据集 {path}，跳过")
+                    continue
+                _copy_window(data[path], out, path, window[:4], bands, chunk_rows, compression_level)
+        os.replace(temp_path, output_path)
+    return window
+
+
+def output_path_for(data_path, output_dir):
+    """输出文件名：原文件名加 _ROI 后缀，如 FY3D_..._1000M_MS_ROI.HDF"""
+    name, ext = os.path.splitext(os.path.basename(data_path))
+    return os.path.join(output_dir or os.path.dirname(os.path.abspath(data_path)), f"{name}_ROI{ext or '.HDF'}")
+
+
+def _mark_sources_processed(config, paths, output_path):
+    """
+    原始文件删除后：下载清单中标记为已处理（保留记录，之后运行不会重新下载），
+    文件目录中删除记录（目录只记录存在的文件）
+    """
+    from download_manifest import DownloadManifest
+    from granule_catalog import GranuleCatalog
+
+    manifest = DownloadManifest(config.get_download_dir())
+    catalog_file = config.get_catalog_file()
+    catalog = GranuleCatalog(catalog_file) if catalog_file else None
+    try:
+        for path in paths:
+            manifest.mark_processed(os.path.basename(path), output_path)
+            if catalog is not None:
+                catalog.remove(path)
+    finally:
+        manifest.close()
+        if catalog is not None:
+            catalog.close()
+
+
+def process_granule(files, scene):
+    """
+    下载流水线的后处理函数（在子进程中运行）：files 含同一景的 GEO1K 和 1000M 文件
+    裁剪范围、数据集和输出目录见配置 [SUBSET]
+    """
+    from config_handler import ConfigHandler
+
+    if 'GEO1K' not in files or '1000M' not in files:
+        return f"{scene} 不是 1000M/GEO1K 配对，不裁剪"
+    config = ConfigHandler()
+    settings = config.get_subset_settings()
+    output_path = output_path_for(files['1000M'], settings['output_dir'])
+    window = subset_granule(files['GEO1K'], files['1000M'], output_path, settings['bbox'], settings['datasets'],
+                            settings['lat_dataset'], settings['lon_dataset'], settings['chunk_rows'],
+                            settings['compression_level'])
+    if window is None:
+        return f"{scene} 不在裁剪范围内"
+    if settings['delete_source']:
+        sources = (files['GEO1K'], files['1000M'])
+        for path in sources:
+            os.remove(path)
+        _mark_sources_processed(config, sources, output_path)
+    row_start, row_stop, col_start, col_stop, count = window
+    return (f"裁剪为{row_stop - row_start}行×{col_stop - col_start}列（范围内{count}个像元）"
+            f"，{os.path.getsize(output_path) / 1024 / 1024:.1f} MB: {output_path}")
+
+
+def main():
+    from config_handler import ConfigHandler
+
+    settings = ConfigHandler().get_subset_settings()
+    parser = argparse.ArgumentParser(description='按经纬度范围裁剪MERSI L1数据')
+    parser.add_argument('geo_file', help='GEO1K文件')
+    parser.add_argument('data_file', help='1000M文件')
+    parser.add_argument('--bbox', nargs=4, type=float, metavar=('LAT_MIN', 'LAT_MAX', 'LON_MIN', 'LON_MAX'),
+                        default=settings['bbox'], help='裁剪范围（默认见配置 [SUBSET]）')
+    parser.add_argument('--datasets', nargs='+', default=settings['datasets'],
+                        help='要保留的数据集，如 Data/EV_1KM_RefSB[0,2-4] Data/EV_1KM_Emissive')
+    parser.add_argument('--output', help='输出文件（默认为输出目录下的 <原文件名>_ROI.HDF）')
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    output_path = args.output or output_path_for(args.data_file, settings['output_dir'])
+    window = subset_granule(args.geo_file, args.data_file, output_path, tuple(args.bbox), args.datasets,
+                            settings['lat_dataset'], settings['lon_dataset'], settings['chunk_rows'],
+                            settings['compression_level'])
+    if window is None:
+        logger.info("没有像元在裁剪范围内，未生成文件")
+    else:
+        logger.info(f"已写入 {output_path}，窗口 行{window[0]}-{window[1]} 列{window[2]}-{window[3]}，"
+                    f"范围内{window[4]}个像元")
+
+
+if __name__ == '__main__':
+    main()
@@ -41,8 +41,31 @@ def run_program(program_path):
 PROGRAM_A_PATH = "D:/Pycharmcode/test/submit_order.py"  # 程序A的绝对路径
 PROGRAM_B_PATH = "D:/Pycharmcode/test/download.py"  # 程序B的绝对路径
 
+# 合并模式：一个进程、一个浏览器完成提交订单→等待订单完成→下载（代替上面两个程序）
+# 默认仍分别运行两个程序，改为True启用合并模式
+COMBINED_MODE = False
+COMBINED_PROGRAM_PATH = "D:/Pycharmcode/test/combined_worker.py"
+COMBINED_TIME = "22:00"
+
 # 设定定时任务
 def schedule_tasks():
+    if COMBINED_MODE:
+        schedule.every().day.at(COMBINED_TIME).do(
+            run_program,
+            program_path=COMBINED_PROGRAM_PATH
+        )
+        logging.info(f"已设置定时任务：每天{COMBINED_TIME}运行合并模式 {COMBINED_PROGRAM_PATH}")
+    else:
+        schedule_separate_tasks()
+
+    # 循环检查并执行任务
+    logging.info("调度程序启动，开始等待定时任务...")
+    while True:
+        schedule.run_pending()  # 运行所有到期的任务
+        time.sleep(60)  # 每60秒检查一次（减少CPU占用）
+
+def schedule_separate_tasks():
+    """分别运行提交订单和下载两个程序"""
     # 每天8:00运行程序A
     schedule.every().day.at("22:00").do(
         run_program,  # 要执行的函数
@@ -57,11 +80,5 @@ def schedule_tasks():
     )
     logging.info(f"已设置定时任务：每天16:30运行 {PROGRAM_B_PATH}")
 
-    # 循环检查并执行任务
-    logging.info("调度程序启动，开始等待定时任务...")
-    while True:
-        schedule.run_pending()  # 运行所有到期的任务
-        time.sleep(60)  # 每60秒检查一次（减少CPU占用）
-
 if __name__ == "__main__":
     schedule_tasks()
@@ -0,0 +1,148 @@
+# session_store.py
+import json
+import logging
+import os
+import time
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken  # 可选依赖：没有安装时不保存会话
+except ImportError:
+    Fernet = None
+    InvalidToken = Exception
+
+logger = logging.getLogger(__name__)
+
+# 可以用环境变量提供密钥（Fernet.generate_key() 生成），否则在会话文件旁生成 .key 文件
+KEY_ENV = 'FY_SESSION_KEY'
+
+_READ_LOCAL_STORAGE_JS = """
+var items = {};
+for (var i = 0; i < window.localStorage.length; i++) {
+    var key = window.localStorage.key(i);
+    items[key] = window.localStorage.getItem(key);
+}
+return items;
+"""
+
+_WRITE_LOCAL_STORAGE_JS = """
+var items = arguments[0];
+Object.keys(items).forEach(function (key) { window.localStorage.setItem(key, items[key]); });
+"""
+
+
+class SessionStore:
+    """
+    加密保存登录后的cookies和localStorage，下次运行时恢复，会话有效就不用再识别验证码登录
+    文件内容用Fernet（AES-128-CBC + HMAC）加密，密钥来自环境变量或会话文件旁的 .key 文件
+    """
+    def __init__(self, path, max_age_hours=12):
+        """
+        Args:
+        path: 会话文件路径（空字符串表示不保存会话）
+        max_age_hours: 超过这个时间的会话直接丢弃，不再尝试恢复
+        """
+        self.path = path
+        self.max_age = max_age_hours * 3600
+        self._fernet = None
+        if not path:
+            return
+        if Fernet is None:
+            logger.warning("未安装cryptography，不保存登录会话（每次运行都需要验证码登录）")
+            return
+        self._fernet = Fernet(self._load_key())
+
+    @property
+    def enabled(self):
+        return self._fernet is not None
+
+    def _load_key(self):
+        """读取密钥，没有时生成一个只有当前用户可读的密钥文件"""
+        key = os.environ.get(KEY_ENV)
+        if key:
+            return key.encode()
+        key_path = self.path + '.key'
+        if os.path.exists(key_path):
+            with open(key_path, 'rb') as f:
+                return f.read().strip()
+        key = Fernet.generate_key()
+        os.makedirs(os.path.dirname(os.path.abspath(key_path)), exist_ok=True)
+        fd = os.open(key_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'wb') as f:
+            f.write(key)
+        return key
+
+    def save(self, driver):
+        """登录成功后调用：保存当前页面域名下的cookies和localStorage"""
+        if not self.enabled:
+            return False
+        try:
+            data = {
+                'saved_at': time.time(),
+                'url': driver.current_url,
+                'cookies': driver.get_cookies(),
+                'local_storage': driver.execute_script(_READ_LOCAL_STORAGE_JS) or {},
+            }
+            token = self._fernet.encrypt(json.dumps(data).encode('utf-8'))
+            # 先写临时文件再替换，避免中断时留下损坏的会话文件
+            fd = os.open(self.path + '.tmp', os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with os.fdopen(fd, 'wb') as f:
+                f.write(token)
+            os.replace(self.path + '.tmp', self.path)
+            logger.info(f"已保存登录会话（{len(data['cookies'])}个cookie）")
+            return True
+        except Exception as e:
+            logger.warning(f"保存登录会话失败: {str(e)}")
+            return False
+
+    def load(self):
+        """读取并解密会话，文件不存在、无法解密或已过期时返回None"""
+        if not self.enabled or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, 'rb') as f:
+                data = json.loads(self._fernet.decrypt(f.read()))
+        except (InvalidToken, ValueError, OSError) as e:
+            logger.warning(f"会话文件无法读取，已删除: {str(e) or type(e).__name__}")
+            self.clear()
+            return None
+        age = time.time() - data.get('saved_at', 0)
+        if age > self.max_age:
+            logger.info(f"保存的会话已超过{self.max_age / 3600:.0f}小时，重新登录")
+            self.clear()
+            return None
+        return data
+
+    def restore(self, driver):
+        """
+        把保存的cookies和localStorage写回浏览器并刷新页面
+        调用前浏览器必须已打开门户页面（cookie只能写入当前域名）
+        Returns:
+        是否恢复了会话（恢复后仍需用页面元素确认会话有效）
+        """
+        data = self.load()
+        if not data:
+            return False
+        try:
+            for cookie in data['cookies']:
+                cookie = dict(cookie)
+                if 'expiry' in cookie:
+                    cookie['expiry'] = int(cookie['expiry'])
+                if cookie.get('sameSite') not in ('Strict', 'Lax', 'None'):
+                    cookie.pop('sameSite', None)
+                try:
+                    driver.add_cookie(cookie)
+                except Exception as e:
+                    logger.debug(f"跳过无法写入的cookie {cookie.get('name')}: {str(e)}")
+            if data.get('local_storage'):
+                driver.execute_script(_WRITE_LOCAL_STORAGE_JS, data['local_storage'])
+            driver.refresh()
+            logger.info("已恢复保存的登录会话，验证是否有效")
+            return True
+        except Exception as e:
+            logger.warning(f"恢复登录会话失败: {str(e)}")
+            return False
+
+    def clear(self):
+        """删除保存的会话（会话失效时调用）"""
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
@@ -0,0 +1,135 @@
+# storage_layout.py
+"""
+下载目录的分层存放规则（配置 storage_layout，默认为空即不分层），如 {satellite}/{product}/{YYYY}/{MM}/{DD}：
+FY3D_MERSI_GBAL_L1_20251013_0500_1000M_MS.HDF → FY3D/1000M/2025/10/13/
+文件名不符合风云命名规则的文件仍放在下载目录下
+用法（设置 storage_layout 后，把已有的平铺文件移动到分层目录，只重命名不复制）：
+    python storage_layout.py migrate [--dry-run] [平铺目录 ...]
+    默认整理配置的下载目录，以及以前HTTP下载使用的 FY4B_Downloads
+"""
+import argparse
+import logging
+import os
+
+from link_extractor import parse_granule_name
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LAYOUT = '{satellite}/{product}/{YYYY}/{MM}/{DD}'
+
+
+class StorageLayout:
+    """按文件名决定文件在下载目录中的存放位置"""
+    def __init__(self, root, pattern=DEFAULT_LAYOUT):
+        """
+        Args:
+        root: 下载目录
+        pattern: 子目录模板，可用 {satellite} {instrument} {region} {level} {product} {unit}
+                 {YYYY} {MM} {DD} {HH}；空字符串表示不分层（所有文件直接放在下载目录）
+        """
+        self.root = root
+        self.pattern = pattern.strip().strip('/\\')
+
+    def directory_for(self, filename):
+        """文件应该所在的目录（不创建）"""
+        fields = parse_granule_name(filename) if self.pattern else None
+        if not fields:
+            return self.root
+        date, time = fields['date'], fields['time']
+        subdir = self.pattern.format(YYYY=date[:4], MM=date[4:6], DD=date[6:8], HH=time[:2], **fields)
+        return os.path.join(self.root, *subdir.replace('\\', '/').split('/'))
+
+    def path_for(self, filename):
+        """文件的完整保存路径，目录不存在时创建"""
+        directory = self.directory_for(filename)
+        os.makedirs(directory, exist_ok=True)
+        return os.path.join(directory, filename)
+
+    def migrate(self, source_dir=None, dry_run=False, catalog=None, manifest=None):
+        """
+        把平铺目录中的HDF文件（及未完成的.part文件）按规则移动到下载目录的子目录
+        只用重命名，不复制数据；目标已存在同名文件或不在同一文件系统时跳过
+        Args:
+        source_dir: 平铺目录，默认为下载目录本身
+        catalog: GranuleCatalog，传入时同步更新文件路径
+        manifest: DownloadManifest，传入时同步更新记录的本地路径（下载完成后按此路径写入目录和交给流水线）
+        Returns:
+        {'moved': 移动数, 'skipped': 跳过数}
+        """
+        source_dir = source_dir or self.root
+        counts = {'moved': 0, 'skipped': 0}
+        if not self.pattern or not os.path.isdir(source_dir):
+            return counts
+        for name in sorted(os.listdir(source_dir)):
+            source = os.path.join(source_dir, name)
+            filename = name[:-len('.part')] if name.endswith('.part') else name
+            if not filename.lower().endswith('.hdf') or not os.path.isfile(source):
+                continue
+            directory = self.directory_for(filename)
+            if os.path.abspath(directory) == os.path.abspath(self.root):
+                continue  # 不符合命名规则，留在原处
+            if os.path.abspath(directory) == os.path.abspath(source_dir):
+                continue
+            target = os.path.join(directory, name)
+            if os.path.exists(target):
+                logger.warning(f"目标已存在，跳过: {target}")
+                counts['skipped'] += 1
+                continue
+            if dry_run:
+                logger.info(f"将移动: {source} → {target}")
+            else:
+                os.makedirs(directory, exist_ok=True)
+                try:
+                    os.rename(source, target)
+                except OSError as e:
+                    logger.warning(f"无法移动{source}（{str(e)}），跳过")
+                    counts['skipped'] += 1
+                    continue
+                if name == filename:
+                    if manifest is not None:
+                        manifest.relocate(filename, target)
+                    if catalog is not None:
+                        catalog.add(target)  # 同名记录改为新路径（保留下载时记录的校验值和来源）
+            counts['moved'] += 1
+        logger.info(f"{'检查' if dry_run else '整理'}{source_dir}: 移动{counts['moved']}个文件，跳过{counts['skipped']}个")
+        return counts
+
+
+def layout_from_config(config):
+    """按配置创建下载目录的存放规则"""
+    return StorageLayout(config.get_download_dir(), config.get_storage_layout())
+
+
+def main():
+    from config_handler import ConfigHandler
+    from granule_catalog import GranuleCatalog
+    from download_manifest import DownloadManifest
+
+    parser = argparse.ArgumentParser(description='按存放规则整理下载目录')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    p = subparsers.add_parser('migrate', help='把平铺的文件移动到分层目录（只重命名，不复制）')
+    p.add_argument('directories', nargs='*', help='要整理的平铺目录（默认为配置的下载目录和FY4B_Downloads）')
+    p.add_argument('--dry-run', action='store_true', help='只列出将要移动的文件')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    config = ConfigHandler()
+    catalog_file = config.get_catalog_file()
+    catalog = GranuleCatalog(catalog_file) if catalog_file and not args.dry_run else None
+    # 所有下载（包括以前HTTP下载到FY4B_Downloads的文件）都记录在下载目录的清单中
+    manifest = DownloadManifest(config.get_download_dir()) if not args.dry_run else None
+    try:
+        layout = layout_from_config(config)
+        if not layout.pattern:
+            parser.error('配置 storage_layout 为空（不分层），请先设置子目录规则，如 {satellite}/{product}/{YYYY}/{MM}/{DD}')
+        for directory in args.directories or [config.get_download_dir(), config.get_http_download_dir()]:
+            layout.migrate(directory, args.dry_run, catalog, manifest)
+    finally:
+        if catalog is not None:
+            catalog.close()
+        if manifest is not None:
+            manifest.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -1,31 +1,22 @@
 # 导入所需库
-from selenium import webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.options import Options
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
-from selenium.webdriver.support import expected_conditions as EC
-from selenium.common.exceptions import (
-    TimeoutException, NoSuchElementException,
-    ElementClickInterceptedException, StaleElementReferenceException
-)
-from selenium.webdriver.common.keys import Keys
-import ddddocr  # 用于验证码识别
+# selenium、ddddocr、webdriver_manager导入很慢，在用到时才导入（定位方式用 page_waits.By）
 import time
 import os
-from PIL import Image
-import io
 import logging
 import configparser
 from pathlib import Path
 import traceback
-from webdriver_manager.chrome import ChromeDriverManager  # 自动管理chromedriver
 from ftplib import FTP
 from urllib.parse import urlparse
 '''
 从textt中导入ftp下载方法
 '''
 from config_handler import ConfigHandler
+from tracing import tracer  # 记录浏览器流程各步骤耗时
+from page_waits import PageWaiter, By  # 按页面状态等待
+from browser_profile import launch_chrome, apply_network_profile, quit_driver
+from captcha_solver import CaptchaSolver  # 验证码识别（模型进程内共用，用到时才加载）
+from session_store import SessionStore  # 保存登录会话
 
 # 设置日志文件路径
 log_file = os.path.join(os.path.dirname(os.path.abspath(__file__)), "submit_order.log")
@@ -49,47 +40,77 @@ logger.info(f"日志文件路径: {log_file}")
 logger.info(f"当前工作目录: {os.getcwd()}")
 
 
+# 批量填写输入框：用原生setter赋值（绕过框架对value的拦截），再依次触发门户脚本监听的事件
+_FILL_FIELDS_JS = """
+var setter = Object.getOwnPropertyDescriptor(HTMLInputElement.prototype, 'value').set;
+arguments[0].forEach(function (field) {
+    var node = findNode(field[0], field[1]);
+    if (!node) return;
+    node.focus();
+    setter.call(node, field[2]);
+    ['input', 'keyup', 'change'].forEach(function (type) {
+        node.dispatchEvent(new Event(type, {bubbles: true}));
+    });
+    node.blur();
+});
+"""
+
+# 一次读回所有输入框的值（找不到的字段返回null）
+_READ_FIELDS_JS = """
+return arguments[0].map(function (field) {
+    var node = findNode(field[0], field[1]);
+    return node ? node.value : null;
+});
+"""
+
+# 两段脚本共用的元素查找函数（支持XPath、ID和CSS选择器）
+_FIND_NODE_JS = """
+function findNode(by, value) {
+    if (by === 'xpath') {
+        return document.evaluate(value, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    }
+    if (by === 'id') return document.getElementById(value);
+    return document.querySelector(value);
+}
+"""
+
+
+def to_degree_minute(value):
+    """把十进制度数转换为门户输入框需要的（度, 分）文本，如 60 → ("60", "00")，-10.5 → ("-10", "30")"""
+    degree = int(value)
+    minute = int(round(abs(value - degree) * 60))
+    if minute == 60:  # 四舍五入进位
+        degree += 1 if value >= 0 else -1
+        minute = 0
+    sign = '-' if value < 0 and degree == 0 else ''
+    return f"{sign}{degree}", f"{minute:02d}"
+
+
 # 浏览器操作类
 class SatelliteBrowser:
-    def __init__(self, config):
+    def __init__(self, config, ocr=None):
         self.config = config  # 日志配置
         self.driver = None
         self.wait = None
+        self.waiter = None
         self.timeout = config.get_timeout()
         self.retry_attempts = config.get_retry_attempts()
-        self.ocr = ddddocr.DdddOcr()
+        # 验证码识别：可传入模型；默认第一次识别验证码时加载进程内共用的模型
+        self.captcha = CaptchaSolver.from_config(config, ocr=ocr)
+        self.captcha_refreshes = config.get_captcha_refreshes()
+        self.last_captcha = None  # 上一次识别的 (图片, 结果)，登录结果出来后保存为语料
 
     def init_browser(self):
         """初始化浏览器"""
         try:
-            # 1创建设置浏览器对象
-            chrome_options = Options()
-            # 2基本配置
-            chrome_options.page_load_strategy = 'eager'  # 或 'normal' 页面加载策略设置为"急切"模式
-            chrome_options.add_argument('--disable-background-timer-throttling')  #禁用后台标签页的定时器节流
-            chrome_options.add_argument('--disable-renderer-backgrounding')  #禁用渲染进程的后台降级
-
-            chrome_options.add_argument('--no-sandbox')  # 禁用 Chrome 的沙箱模式。
-            chrome_options.add_argument('--window-size=1920,1080')  # 指定浏览器窗口的初始尺寸为 1920x1080 像素
-            chrome_options.add_argument('--disable-gpu')  # 禁用 GPU 加速
-            chrome_options.add_argument('--disable-dev-shm-usage')  # 禁用 /dev/shm 临时目录的使用（Linux 系统特有）。
-            chrome_options.add_argument('--ignore-certificate-errors')  # 忽略 SSL 证书错误。
-            chrome_options.add_experimental_option('detach', True)  # # 保持浏览器打开状态,让Chrome浏览器在自动化脚本执行完毕后不自动关闭。
-
-
-            # 设置Chrome驱动
-            driver_path = self.config.get_chrome_driver_path()   # 从配置文件中获取驱动文件的path
-            if driver_path and os.path.exists(driver_path):
-                service = Service(driver_path)  # 用于管理 Chrome驱动程序的进程
-            else:
-                # 自动下载并使用合适版本的chromedriver
-                service = Service(ChromeDriverManager().install())
-                logger.info("使用自动管理的ChromeDriver")
-
-            # 创建并启动浏览器    设置等待
-            self.driver = webdriver.Chrome(service=service, options=chrome_options)  # 传入自定义的Service对象，chrome_options对象
+            from selenium.webdriver.support.ui import WebDriverWait
+            # 创建并启动浏览器（驱动路径：配置文件 > 本地缓存 > ChromeDriverManager）    设置等待
+            self.driver = launch_chrome(self.config)
+            apply_network_profile(self.driver, self.config)  # 屏蔽图片、字体等资源
             self.driver.implicitly_wait(self.timeout)  # 设置隐式等待
             self.wait = WebDriverWait(self.driver, self.timeout)  # 创建显式等待对象
+            # 按页面状态等待（代替固定sleep），轮询间隔见配置 wait_poll_interval
+            self.waiter = PageWaiter(self.driver, self.timeout, poll_frequency=self.config.get_wait_poll_interval())
 
             logger.info("浏览器初始化成功")
             return True
@@ -99,6 +120,20 @@ class SatelliteBrowser:
             logger.error(traceback.format_exc())    # 将程序运行时的错误堆栈信息详细记录到日志中
             return False
 
+    def close(self):
+        """关闭浏览器，结束chromedriver和Chrome进程"""
+        quit_driver(self.driver, self.config)
+        self.driver = None
+        self.wait = None
+        self.waiter = None
+
+    def attach(self, other):
+        """复用另一个SatelliteBrowser已经启动的浏览器（合并模式下两个流程共用一个Chrome）"""
+        self.driver = other.driver
+        self.wait = other.wait
+        self.waiter = other.waiter
+
+    @tracer.traced(args=('value', 'retry'))
     def safe_find_element(self, by, value, retry=0):
         """
         安全查找元素，带重试机制
@@ -107,21 +142,28 @@ class SatelliteBrowser:
         value: 定位方式对应的值（如 ID 属性值、XPath 表达式等）
         retry: 当前重试次数，默认为 0（表示首次尝试）
         """
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
         try:
-            return self.wait.until(EC.presence_of_element_located((by, value)))  # 使用创建的显式等待对象 self.wait等待元素「出现」
+            with tracer.span('wait.until', cat='wait', condition='presence', value=value):
+                return self.wait.until(EC.presence_of_element_located((by, value)))  # 使用创建的显式等待对象 self.wait等待元素「出现」
         except (TimeoutException, StaleElementReferenceException) as e:  # 捕获两种异常：显式等待超时和元素已失效（如页面刷新导致元素被重新渲染）
             if retry < self.retry_attempts:
                 logger.warning(f"查找元素失败，重试 {retry + 1}/{self.retry_attempts} - {by}: {value}")
-                time.sleep(1)
+                tracer.sleep(1)
                 return self.safe_find_element(by, value, retry + 1)
             logger.error(f"多次尝试后仍无法找到元素: {by}: {value}")
             logger.error(traceback.format_exc())
             return None
 
+    @tracer.traced(args=('value', 'retry'))
     def safe_click_element(self, by, value, retry=0):
         """安全点击元素，带重试机制"""
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, ElementClickInterceptedException, StaleElementReferenceException
         try:
-            element = self.wait.until(EC.element_to_be_clickable((by, value)))
+            with tracer.span('wait.until', cat='wait', condition='clickable', value=value):
+                element = self.wait.until(EC.element_to_be_clickable((by, value)))
             element.click()
             logger.info(f"成功点击元素: {by}: {value}")
             return True
@@ -132,7 +174,7 @@ class SatelliteBrowser:
                 try:
                     element = self.driver.find_element(by, value)  # 简单的查找元素 不是自己写的safe查找
                     self.driver.execute_script("arguments[0].scrollIntoView();", element)  # 这段代码可以确保元素进入视野，再进行后续操作
-                    time.sleep(1)
+                    tracer.sleep(1)
                 except:
                     pass
                 return self.safe_click_element(by, value, retry + 1)
@@ -140,10 +182,14 @@ class SatelliteBrowser:
             logger.error(traceback.format_exc())
             return False
 
+    @tracer.traced(args=('value', 'retry'))  # 不记录text（可能是密码）
     def safe_send_keys(self, by, value, text, retry=0):
         """安全输入文本，带重试机制"""
+        from selenium.webdriver.support import expected_conditions as EC
+        from selenium.common.exceptions import TimeoutException, StaleElementReferenceException
         try:
-            element = self.wait.until(EC.element_to_be_clickable((by, value)))
+            with tracer.span('wait.until', cat='wait', condition='clickable', value=value):
+                element = self.wait.until(EC.element_to_be_clickable((by, value)))
             element.clear()
             element.send_keys(text)
             logger.info(f"成功输入文本到元素: {by}: {value}")
@@ -151,42 +197,103 @@ class SatelliteBrowser:
         except (TimeoutException, StaleElementReferenceException) as e:
             if retry < self.retry_attempts:
                 logger.warning(f"输入文本失败，重试 {retry + 1}/{self.retry_attempts} - {by}: {value}")
-                time.sleep(1)
+                tracer.sleep(1)
                 return self.safe_send_keys(by, value, text, retry + 1)
             logger.error(f"多次尝试后仍无法输入文本到元素: {by}: {value}")
             logger.error(traceback.format_exc())
             return False
 
+    @tracer.traced(args=('retry',))
     def solve_captcha(self, captcha_xpath, retry=0):
-        """解决验证码"""
+        """解决验证码：识别结果不可信（置信度低或长度不对）时先刷新验证码再识别，不提交可能错误的结果"""
         try:
-            # 获取验证码图片
-            captcha_element = self.safe_find_element(By.XPATH, captcha_xpath)
-            if not captcha_element:
-                return None
-
-            png_data = captcha_element.screenshot_as_png
-            # 识别验证码
-            result = self.ocr.classification(png_data)
-            logger.info(f"识别到验证码: {result}")
-            return result
+            locator = (By.XPATH, captcha_xpath)
+            for attempt in range(self.captcha_refreshes + 1):
+                # 获取验证码图片
+                captcha_element = self.safe_find_element(*locator)
+                if not captcha_element:
+                    return None
+
+                png_data = captcha_element.screenshot_as_png
+                # 识别验证码（限制字符集和长度，必要时预处理图片）
+                result = self.captcha.solve(png_data)
+                self.last_captcha = (png_data, result.text)
+                if result.accepted:
+                    logger.info(f"识别到验证码: {result.text}（置信度{result.confidence:.2f}，{result.seconds * 1000:.0f}毫秒）")
+                    return result.text
+                if attempt < self.captcha_refreshes:
+                    logger.info(f"验证码识别结果不可信: {result.text}（置信度{result.confidence:.2f}），刷新验证码 "
+                                f"{attempt + 1}/{self.captcha_refreshes}")
+                    old_src = self.waiter.image_src(locator)
+                    captcha_element.click()  # 点击验证码刷新
+                    self.waiter.image_reloaded(locator, old_src, timeout=3)
+            # 刷新多次仍不可信时提交最后一次结果，由登录结果判断
+            logger.info(f"验证码刷新{self.captcha_refreshes}次后仍不可信，提交最后一次结果: {result.text}"
+                        f"（置信度{result.confidence:.2f}）")
+            return result.text or None
         except Exception as e:
             if retry < self.retry_attempts:
                 logger.warning(f"验证码识别失败，重试 {retry + 1}/{self.retry_attempts}")
-                time.sleep(1)
+                tracer.sleep(1)
                 return self.solve_captcha(captcha_xpath, retry + 1)
             logger.error(f"验证码识别失败: {str(e)}")
             logger.error(traceback.format_exc())
             return None
 
 
+    def report_captcha(self, correct):
+        """登录结果出来后调用：把上一次识别的验证码保存到语料目录（见配置 [CAPTCHA] corpus_dir）"""
+        if self.last_captcha:
+            png_data, text = self.last_captcha
+            self.captcha.record(png_data, text, correct)
+            self.last_captcha = None
+
+    @tracer.traced()
+    def fill_fields(self, fields):
+        """
+        批量填写输入框：一次execute_script赋值并触发input/change事件，再一次读回校验
+        Args:
+        fields: {定位符(by, value): 文本}，按字典顺序填写
+        Returns:
+        是否全部填写成功（读回不一致的字段退回safe_send_keys逐个输入）
+        """
+        from selenium.common.exceptions import WebDriverException
+        items = [[by, value, str(text)] for (by, value), text in fields.items()]
+        try:
+            self.driver.execute_script(_FIND_NODE_JS + _FILL_FIELDS_JS, items)
+            actual = self.driver.execute_script(_FIND_NODE_JS + _READ_FIELDS_JS, items)
+        except WebDriverException as e:
+            logger.warning(f"批量填写失败，改为逐个输入: {str(e)}")
+            actual = [None] * len(items)
+
+        success = True
+        for (by, value, text), current in zip(items, actual):
+            if current == text:
+                continue
+            logger.warning(f"读回的值不一致（{current!r}，应为{text!r}），改为逐个输入: {by}: {value}")
+            if not self.safe_send_keys(by, value, text):
+                success = False
+        if success:
+            logger.info(f"成功批量填写{len(items)}个输入框")
+        return success
+
+
 # 主程序类
 class SatelliteDataDownloader:
-    def __init__(self):
-        self.config = ConfigHandler()
-        self.browser = SatelliteBrowser(self.config)  # SatelliteBrowser是上面自定义的浏览器类
+    def __init__(self, config=None, browser=None):
+        """
+        Args:
+        config: ConfigHandler，默认读取config.ini
+        browser: 已创建的SatelliteBrowser（合并模式下共用浏览器），默认新建并在运行结束时关闭
+        """
+        self.config = config or ConfigHandler()
+        self.owns_browser = browser is None
+        self.browser = browser or SatelliteBrowser(self.config)  # SatelliteBrowser是上面自定义的浏览器类
         self.user_info = self.config.get_user_info()  # 自定义函数在 config_handler里面  获取账号密码
         self.base_url = 'https://satellite.nsmc.org.cn/DataPortal/cn/home/index.html'  # 风云卫星主网页
+        tracer.enabled = self.config.get_trace_enabled()  # 是否记录各步骤耗时时间线
+        # 加密保存的登录会话（cookies + localStorage），两个程序共用
+        self.session_store = SessionStore(self.config.get_session_file(), self.config.get_session_max_age_hours())
 
         # 页面元素定位符
         self.locators = {
@@ -198,6 +305,8 @@ class SatelliteDataDownloader:
             'captcha_input': (By.XPATH, '//*[@id="inputValidateCodeCN"]'),  # 输入验证码
             'submit_login': (By.XPATH, '//*[@id="logincn"]/div[2]/div/div/div[2]/div[2]/div[6]/button'),  # 点击“登录”
 
+            'my_order': (By.XPATH, '//*[@id="u-myorder"]'),  # 我的订单（登录后才显示，用于确认会话有效）
+
             # 卫星选择
             'FengYun_satellite': (By.XPATH, '/html/body/div[4]/div[4]/div[1]/div/div[1]/div[1]/ul/li[2]'),  # 点击“风云极轨卫星”
             'fy3d_satellite': (By.XPATH, '/html/body/div[4]/div[4]/div[1]/div/div[1]/div[3]/ul/li[4]'),   # FY-3D
@@ -226,6 +335,7 @@ class SatelliteDataDownloader:
             'disChoose_250data': (By.XPATH, '//*[@id="fileListHead"]/th[3]/div/ul/li[3]/a/input'),  # 取消选择250m的卫星数据
             'click_filter': (By.XPATH, '//*[@id="searchId"]'),  # 点击"筛选”
 
+            'result_rows': (By.XPATH, '/html/body/div[9]/div/div[2]/div/div[2]/div[2]/div/table/tbody/tr'),  # 检索结果表格的行
             'second_data_row': (By.XPATH, '/html/body/div[9]/div/div[2]/div/div[2]/div[2]/div/table/tbody/tr[2]/td[1]/input'),  # 第二个多选框
 
             'commit_edit': (By.XPATH, '//*[@id="commitEdit"]'),   # 去购物车
@@ -240,63 +350,92 @@ class SatelliteDataDownloader:
 
         }
 
+    @tracer.traced(cat='step')
     def run(self):
-        """运行主程序"""
+        """运行主程序，返回订单是否提交成功"""
         try:
-            # 初始化浏览器
-            if not self.browser.init_browser():
+            # 初始化浏览器（传入的浏览器已启动时直接复用）
+            if self.browser.driver is None and not self.browser.init_browser():
                 logger.error("无法初始化浏览器，程序退出")
-                return
+                return False
 
             # 打开网站
             logger.info(f"打开网站: {self.base_url}")
-            self.browser.driver.get(self.base_url)
-            time.sleep(2)  # 初始加载等待
+            with tracer.span('打开网站', url=self.base_url):
+                self.browser.driver.get(self.base_url)
+            self.browser.waiter.page_ready()  # 等待首页加载完成
 
             # 执行登录流程
             if not self._login():
                 logger.error("登录失败，程序退出")
-                return
+                return False
 
             # 选择卫星数据
             if not self._select_satellite_data():
                 logger.error("选择卫星数据失败，程序退出")
-                return
+                return False
 
             # 选择地理范围
             if not self._select_Range():
                 logger.error("选择地理范围失败，程序退出")
-                return
+                return False
 
             # 提交订单
             if not self._submit_order():
                 logger.error("提交订单失败，程序退出")
-                return
+                return False
 
             # 查看订单
             if not self._check_order():
                 logger.error("查看订单失败，程序退出")
-                return
+                return False
             logger.info("所有操作完成")
+            return True
 
         except Exception as e:
             logger.error(f"程序运行出错: {str(e)}")
             logger.error(traceback.format_exc())
+            return False
         finally:
-            # 可以根据需要决定是否关闭浏览器
-            # if self.browser.driver:
-            #     self.browser.driver.quit()
-            pass
+            # 保存本次运行的时间线（traces目录）
+            try:
+                tracer.write('submit_order')
+            except OSError as e:
+                logger.error(f"保存时间线失败: {str(e)}")
+            # 关闭浏览器（配置 keep_browser_open = True 时保留；传入的浏览器由调用方关闭）
+            if self.owns_browser:
+                self.browser.close()
+
+    @tracer.traced(cat='step')
+    def _restore_session(self):
+        """恢复上次保存的登录会话，并用'我的订单'元素确认会话仍然有效"""
+        if not self.owns_browser and self.browser.waiter.visible(self.locators['my_order'], '已登录', timeout=1):
+            # 复用的浏览器在前一阶段已经登录
+            logger.info("浏览器已是登录状态，跳过登录")
+            return True
+        if not self.session_store.restore(self.browser.driver):
+            return False
+        self.browser.waiter.page_ready('恢复会话后页面加载')
+        if self.browser.waiter.visible(self.locators['my_order'], '会话有效', timeout=3):
+            logger.info("登录会话有效，跳过验证码登录")
+            return True
+        logger.info("保存的会话已失效，改为验证码登录")
+        self.session_store.clear()
+        return False
 
+    @tracer.traced(cat='step')
     def _login(self):
         """ 执行登录流程（增加验证码错误重试逻辑） """
         logger.info("开始登录流程")
+        # 先尝试恢复上次保存的会话，有效时不需要识别验证码
+        if self._restore_session():
+            return True
         max_login_retries = self.config.get_retry_attempts()  # 从配置文件获取最大重试次数（与原重试次数一致）
 
         # 1. 先点击登录按钮（仅需点击一次，弹出登录弹窗）
         if not self.browser.safe_click_element(*self.locators['login_button']):
             return False
-        time.sleep(1)   # 等待登录弹窗弹出
+        self.browser.waiter.visible(self.locators['username_input'], '登录弹窗弹出')
 
         # 2. 循环重试验证码（直到登录成功或达到最大次数）
         for retry in range(max_login_retries):
@@ -317,7 +456,6 @@ class SatelliteDataDownloader:
                 captcha_input = self.browser.safe_find_element(*self.locators['captcha_input'])  # 找到验证码输入框
                 if captcha_input:
                     captcha_input.clear()
-                    time.sleep(0.5)
 
                 # 识别新验证码
                 captcha_text = self.browser.solve_captcha(self.locators['captcha_image'][1])  # 上面写的识别验证码的函数
@@ -336,7 +474,8 @@ class SatelliteDataDownloader:
                 if not self.browser.safe_click_element(*self.locators['submit_login']):
                     logger.warning(f"登录提交失败，重试 {retry + 1}/{max_login_retries}")
                     continue  # 提交失败，直接重试
-                time.sleep(3)  # 等待登录结果（关键：给页面足够时间判断登录状态）
+                # 等待登录请求返回（下面查找元素时仍有显式等待兜底）
+                self.browser.waiter.ajax_idle('登录结果')
 
                 # --------------------------
                 # 步骤4：验证登录是否成功（核心判定逻辑）
@@ -346,8 +485,11 @@ class SatelliteDataDownloader:
                 fengyun_element = self.browser.safe_find_element(*self.locators['FengYun_satellite'])  # 注意key是'FengYun_satellite'（原代码中首字母大写）
                 if fengyun_element:
                     logger.info("成功找到'风云极轨卫星'元素，登录成功")
+                    self.browser.report_captcha(True)  # 验证码正确，保存为已标注的语料
+                    self.session_store.save(self.browser.driver)  # 保存会话，下次运行直接恢复
                     return True  # 登录成功，退出循环
                 else:
+                    self.browser.report_captcha(False)
                     raise Exception("未找到'风云极轨卫星'元素，可能是因为验证码输入错误，未成功登录")  # 触发异常，进入重试流程
 
             except Exception as e:
@@ -357,8 +499,10 @@ class SatelliteDataDownloader:
                     # 关键：点击验证码图片，刷新新的验证码（触发页面重新生成验证码）
                     captcha_image = self.browser.safe_find_element(*self.locators['captcha_image'])
                     if captcha_image:
+                        old_src = self.browser.waiter.image_src(self.locators['captcha_image'])
                         captcha_image.click()  # 点击验证码刷新
-                        time.sleep(1)  # 等待新验证码加载
+                        # 等待新验证码加载（src不变的门户最多等3秒）
+                        self.browser.waiter.image_reloaded(self.locators['captcha_image'], old_src, timeout=3)
                     else:
                         logger.error("无法找到验证码图片，无法刷新")
                         continue
@@ -372,6 +516,7 @@ class SatelliteDataDownloader:
         return False
 
 
+    @tracer.traced(cat='step')
     def _select_satellite_data(self):
         """选择卫星数据"""
         logger.info("开始选择卫星数据")
@@ -379,11 +524,11 @@ class SatelliteDataDownloader:
         # 选择风云极轨卫星
         if not self.browser.safe_click_element(*self.locators['FengYun_satellite']):
             return False
-        time.sleep(1)
+        self.browser.waiter.ajax_idle('卫星列表加载')
         # 选择FY-3D
         if not self.browser.safe_click_element(*self.locators['fy3d_satellite']):
             return False
-        time.sleep(1)
+        self.browser.waiter.ajax_idle('数据级别加载')
         # 选择1级数据
         if not self.browser.safe_click_element(*self.locators['level1_data']):
             return False
@@ -397,37 +542,24 @@ class SatelliteDataDownloader:
         logger.info("卫星数据选择完成")
         return True
 
+    @tracer.traced(cat='step')
     def _select_Range(self):
         """空间范围选择"""
         logger.info("开始选择空间范围")
         #点击 “空间范围”
         if not self.browser.safe_click_element(*self.locators['click_GeographicalRange']):
             return False
-        # 输入坐标
-        if not self.browser.safe_send_keys(*self.locators['N_degree'], "60"):
-            return False
-        time.sleep(0.5)
-        if not self.browser.safe_send_keys(*self.locators['N_minute'], "00"):
-            return False
-        time.sleep(0.5)
-        if not self.browser.safe_send_keys(*self.locators['W_degree'], "-180"):
-            return False
-        time.sleep(0.5)
-        if not self.browser.safe_send_keys(*self.locators['W_minute'], "00"):
-            return False
-        time.sleep(0.5)
-        if not self.browser.safe_send_keys(*self.locators['E_degree'], "180"):
-            return False
-        time.sleep(0.5)
-        if not self.browser.safe_send_keys(*self.locators['E_minute'], "00"):
-            return False
-        time.sleep(0.5)
-        if not self.browser.safe_send_keys(*self.locators['S_degree'], "90"):
-            return False
-        time.sleep(0.5)
-        if not self.browser.safe_send_keys(*self.locators['S_minute'], "00"):
+        self.browser.waiter.visible(self.locators['N_degree'], '空间范围弹窗')
+        # 输入坐标：范围来自配置文件[ROI]，一次脚本调用填写全部8个输入框
+        roi = self.config.get_roi()
+        fields = {}
+        for side, key in (('N', 'north'), ('W', 'west'), ('E', 'east'), ('S', 'south')):
+            degree, minute = to_degree_minute(roi[key])
+            fields[self.locators[f'{side}_degree']] = degree
+            fields[self.locators[f'{side}_minute']] = minute
+        logger.info(f"空间范围: 北{roi['north']} 西{roi['west']} 东{roi['east']} 南{roi['south']}")
+        if not self.browser.fill_fields(fields):
             return False
-        time.sleep(0.5)
         # 点击显示范围  点击确定
         if not self.browser.safe_click_element(*self.locators['click_displayRange']):
             return False
@@ -436,14 +568,18 @@ class SatelliteDataDownloader:
 
         logger.info("选择空间范围完成")
         return True
+    @tracer.traced(cat='step')
     def _submit_order(self):
         """提交订单"""
         logger.info("开始提交订单")
-        time.sleep(2)
+        # 等待空间范围弹窗关闭
+        self.browser.waiter.invisible(self.locators['click_confirm1'], '空间范围弹窗关闭')
         # 点击检索
         if not self.browser.safe_click_element(*self.locators['search_button']):
             return False
-        time.sleep(3)  # 等待搜索结果
+        # 等待搜索结果
+        self.browser.waiter.present(self.locators['result_rows'], '检索结果', min_count=2)
+        self.browser.waiter.ajax_idle('检索请求完成')
 
 
         #  筛选数据
@@ -456,25 +592,27 @@ class SatelliteDataDownloader:
         # 点击筛选
         if not self.browser.safe_click_element(*self.locators['click_filter']):
             return False
-        time.sleep(1)
+        self.browser.waiter.ajax_idle('筛选结果')
+        self.browser.waiter.present(self.locators['result_rows'], '筛选结果', min_count=2)
         # 选中第二个数据
         if not self.browser.safe_click_element(*self.locators['second_data_row']):
             return False
-        time.sleep(1)
+        self.browser.waiter.ajax_idle('选中数据')
         # 点击提交编辑
         if not self.browser.safe_click_element(*self.locators['commit_edit']):
             return False
         # 勾选发送确认邮件
         if not self.browser.safe_click_element(*self.locators['send_email_checkbox']):
             return False
-        time.sleep(1)
         # 提交订单
         if not self.browser.safe_click_element(*self.locators['submit_order']):
             return False
-        time.sleep(1)
+        # 等待提交成功弹窗（其中有"查看订单"按钮）
+        self.browser.waiter.visible(self.locators['check_order'], '订单提交结果')
         logger.info("订单提交完成")
         return True
 
+    @tracer.traced(cat='step')
     def _check_order(self):
         """检查订单"""
         logger.info("查看订单")
@@ -0,0 +1,6 @@
+# conftest.py
+import os
+import sys
+
+# 项目模块都在仓库根目录（没有打包），测试时把根目录加入导入路径
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
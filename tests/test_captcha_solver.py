@@ -0,0 +1,78 @@
+# test_captcha_solver.py
+"""用合成图片测试验证码预处理（Otsu二值化、去噪点）和识别结果的字符集、长度过滤"""
+import io
+
+import pytest
+
+from captcha_solver import CaptchaSolver, _otsu_threshold, preprocess
+
+Image = pytest.importorskip('PIL.Image')
+
+
+def _synthetic_captcha():
+    """灰色背景上一块深色“字符”，加几个孤立的亮噪点"""
+    image = Image.new('L', (40, 20), 170)
+    for x in range(10, 30):
+        for y in range(5, 15):
+            image.putpixel((x, y), 60)
+    for x, y in ((2, 2), (35, 17), (20, 10)):
+        image.putpixel((x, y), 250)
+    output = io.BytesIO()
+    image.convert('RGB').save(output, format='PNG')
+    return output.getvalue()
+
+
+class FakeOcr:
+    """按顺序返回预设的识别结果，记录收到的图片"""
+
+    def __init__(self, *results):
+        self.results = list(results)
+        self.images = []
+
+    def set_ranges(self, charset):
+        pass
+
+    def classification(self, png_data, probability=False):
+        self.images.append(png_data)
+        return self.results.pop(0)
+
+
+def test_otsu_threshold_separates_two_levels():
+    histogram = [0] * 256
+    histogram[40] = 300
+    histogram[200] = 700
+    threshold = _otsu_threshold(histogram)
+    assert 40 <= threshold < 200
+    # 只有一种灰度时没有可分的两类，返回默认阈值
+    assert _otsu_threshold([0] * 100 + [50] + [0] * 155) == 127
+
+
+def test_preprocess_binarizes_and_removes_noise():
+    image = Image.open(io.BytesIO(preprocess(_synthetic_captcha())))
+    assert image.mode == 'L'
+    assert [value for value, count in enumerate(image.histogram()) if count] == [0, 255]
+    assert image.getpixel((20, 8)) == 0  # 字符保留为黑色
+    assert image.getpixel((5, 15)) == 255  # 背景为白色
+    assert image.getpixel((20, 10)) == 0  # 字符中的噪点被中值滤波去掉
+    assert image.getpixel((2, 2)) == 255
+
+
+def test_result_is_filtered_to_charset_and_length():
+    solver = CaptchaSolver(ocr=FakeOcr({'text': 'A-b 3c', 'confidence': 0.9}), use_preprocess=False)
+    result = solver.solve(b'png')
+    assert result.text == 'ab3c'
+    assert result.accepted and result.source == 'raw'
+
+    # 过滤后长度不对时不可信，改用预处理后的图片再识别
+    ocr = FakeOcr({'text': 'ab!', 'confidence': 0.9}, {'text': 'xy12', 'confidence': 0.8})
+    result = CaptchaSolver(ocr=ocr).solve(_synthetic_captcha())
+    assert result.text == 'xy12'
+    assert result.accepted and result.source == 'preprocessed'
+    assert len(ocr.images) == 2
+
+
+def test_low_confidence_is_rejected():
+    ocr = FakeOcr({'text': 'ab12', 'confidence': 0.3}, {'text': 'ab1', 'confidence': 0.5})
+    result = CaptchaSolver(ocr=ocr, min_confidence=0.6).solve(_synthetic_captcha())
+    assert not result.accepted
+    assert result.text == 'ab1' and result.source == 'preprocessed'  # 两次都不可信时取置信度较高的
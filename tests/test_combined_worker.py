@@ -0,0 +1,60 @@
+# test_combined_worker.py
+"""合并模式的退出码：下载阶段登录失败时进程应以1退出（schedule_runner据此记录失败）"""
+import pytest
+
+import combined_worker
+import download
+import submit_order
+from config_handler import ConfigHandler
+
+
+class FakeDriver:
+    current_url = 'https://satellite.nsmc.org.cn/DataPortal/cn/home/index.html'
+
+    def get(self, url):
+        self.current_url = url
+
+
+class FakeWaiter:
+    def page_ready(self, *args, **kwargs):
+        return True
+
+
+def _fake_init_browser(self):
+    self.driver = FakeDriver()
+    self.waiter = FakeWaiter()
+    return True
+
+
+@pytest.fixture
+def config(tmp_path, monkeypatch):
+    config = ConfigHandler(str(tmp_path / 'config.ini'))
+    config.config.set('SETTINGS', 'enable_trace', 'False')
+    config.config.set('SETTINGS', 'session_file', '')
+    config.config.set('SETTINGS', 'download_dir', str(tmp_path / 'downloads'))
+    monkeypatch.setattr(combined_worker, 'ConfigHandler', lambda: config)
+    # 不启动Chrome：提交订单和等待订单都成功
+    monkeypatch.setattr(download.SatelliteBrowser, 'init_browser', _fake_init_browser)
+    monkeypatch.setattr(download.SatelliteBrowser, 'close', lambda self: None)
+    monkeypatch.setattr(submit_order.SatelliteBrowser, 'attach', lambda self, other: None)
+    monkeypatch.setattr(submit_order.SatelliteDataDownloader, 'run', lambda self: True)
+    monkeypatch.setattr(download.SatelliteDataDownloader, 'wait_for_order_ready',
+                        lambda self, timeout, interval: True)
+    return config
+
+
+def test_login_failure_exits_with_code_1(config, monkeypatch):
+    monkeypatch.setattr(download.SatelliteDataDownloader, '_login', lambda self: False)
+    assert combined_worker.main() == 1
+
+
+def test_download_exception_exits_with_code_1(config, monkeypatch):
+    def crash(self):
+        raise RuntimeError('页面结构变化')
+    monkeypatch.setattr(download.SatelliteDataDownloader, '_login', crash)
+    assert combined_worker.main() == 1
+
+
+def test_successful_run_exits_with_code_0(config, monkeypatch):
+    monkeypatch.setattr(download.SatelliteDataDownloader, 'run', lambda self: True)
+    assert combined_worker.main() == 0
@@ -0,0 +1,153 @@
+# test_download_http_file.py
+"""用本地HTTP服务器测试分段下载、断点续传、不支持Range时的回退和校验和检查"""
+import hashlib
+import logging
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from download_http_file import create_http_session, download_http_file, probe_http_file
+from download_manifest import DownloadManifest
+from file_writer import part_path_for
+
+DATA = os.urandom(3 * 1024 * 1024 + 12345)  # 故意不是分段数的整数倍
+
+
+class RangeHandler(BaseHTTPRequestHandler):
+    """返回DATA；server.support_ranges为False时忽略Range头，总是返回整个文件"""
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_headers(self):
+        self.server.requests.append((self.command, self.headers.get('Range')))
+        match = re.fullmatch(r'bytes=(\d+)-(\d*)', self.headers.get('Range') or '')
+        if match and self.server.support_ranges:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(DATA) - 1
+            if start >= len(DATA):
+                self.send_response(416)
+                self.send_header('Content-Range', f'bytes */{len(DATA)}')
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return b''
+            end = min(end, len(DATA) - 1)
+            self.send_response(206)
+            self.send_header('Content-Range', f'bytes {start}-{end}/{len(DATA)}')
+            body = DATA[start:end + 1]
+        else:
+            self.send_response(200)
+            body = DATA
+        self.send_header('Accept-Ranges', 'bytes' if self.server.support_ranges else 'none')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        return body
+
+    def do_HEAD(self):
+        self._send_headers()
+
+    def do_GET(self):
+        body = self._send_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+
+@pytest.fixture
+def server():
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), RangeHandler)
+    httpd.daemon_threads = True
+    httpd.support_ranges = True
+    httpd.requests = []
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield httpd
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _url(server, name='granule.bin'):
+    return f'http://127.0.0.1:{server.server_address[1]}/{name}'
+
+
+def _range_gets(server):
+    return [value for command, value in server.requests if command == 'GET' and value]
+
+
+def test_probe_uses_head_when_server_advertises_ranges(server):
+    session = create_http_session()
+    assert probe_http_file(session.get, _url(server), {}, False, head=session.head) == (len(DATA), True)
+    assert [command for command, _ in server.requests] == ['HEAD']
+
+    server.support_ranges = False
+    server.requests.clear()
+    assert probe_http_file(session.get, _url(server), {}, False, head=session.head) == (len(DATA), False)
+    assert [command for command, _ in server.requests] == ['HEAD']
+
+
+def test_segmented_download_is_byte_exact(server, tmp_path):
+    assert download_http_file(_url(server), segments=4, segment_min_size=0, session=create_http_session(),
+                              save_dir=tmp_path)
+    assert (tmp_path / 'granule.bin').read_bytes() == DATA
+    assert not os.path.exists(part_path_for(tmp_path / 'granule.bin'))
+    # 4个分段请求，区间首尾相接
+    ranges = sorted(tuple(map(int, value[6:].split('-'))) for value in _range_gets(server))
+    assert len(ranges) == 4
+    assert ranges[0][0] == 0 and ranges[-1][1] == len(DATA) - 1
+    assert all(a[1] + 1 == b[0] for a, b in zip(ranges, ranges[1:]))
+
+
+def test_partial_file_resumes_from_offset(server, tmp_path):
+    offset = len(DATA) // 3
+    with open(part_path_for(tmp_path / 'granule.bin'), 'wb') as f:
+        f.write(DATA[:offset])
+
+    assert download_http_file(_url(server), segments=4, segment_min_size=0, session=create_http_session(),
+                              save_dir=tmp_path)
+    assert (tmp_path / 'granule.bin').read_bytes() == DATA
+    assert _range_gets(server) == [f'bytes={offset}-']
+
+
+def test_server_without_ranges_falls_back_to_single_stream(server, tmp_path):
+    server.support_ranges = False
+    assert download_http_file(_url(server), segments=4, segment_min_size=0, session=create_http_session(),
+                              save_dir=tmp_path)
+    assert (tmp_path / 'granule.bin').read_bytes() == DATA
+    assert [command for command, _ in server.requests] == ['HEAD', 'GET']
+
+
+def test_checksum_is_verified(server, tmp_path):
+    expected = hashlib.md5(DATA).hexdigest()
+    assert download_http_file(_url(server), session=create_http_session(), save_dir=tmp_path,
+                              expected_checksum=expected)
+    assert (tmp_path / 'granule.bin').exists()
+
+    # 分段下载没有流式校验和，下载后补算一遍再比对
+    assert not download_http_file(_url(server, 'bad.bin'), segments=4, segment_min_size=0,
+                                  session=create_http_session(), save_dir=tmp_path, expected_checksum='0' * 32)
+    assert not (tmp_path / 'bad.bin').exists()
+
+
+def test_segmented_download_records_checksum_in_manifest(server, tmp_path):
+    manifest = DownloadManifest(str(tmp_path))
+    try:
+        assert download_http_file(_url(server), segments=4, segment_min_size=0, session=create_http_session(),
+                                  save_dir=tmp_path, manifest=manifest)
+        assert len(_range_gets(server)) == 4
+        assert manifest.get('granule.bin')['checksum'] == 'md5:' + hashlib.md5(DATA).hexdigest()
+    finally:
+        manifest.close()
+
+
+def test_progress_is_logged_one_line_per_file(server, tmp_path, caplog, capsys):
+    with caplog.at_level(logging.INFO, logger='file_writer'):
+        assert download_http_file(_url(server), segments=4, segment_min_size=0, session=create_http_session(),
+                                  save_dir=tmp_path)
+    progress = [record.getMessage() for record in caplog.records if record.getMessage().startswith('下载进度')]
+    assert progress and progress[-1].startswith('下载进度: granule.bin 100.0%')
+    assert capsys.readouterr().out == ''  # 进度不再直接打印到控制台
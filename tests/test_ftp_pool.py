@@ -0,0 +1,122 @@
+# test_ftp_pool.py
+"""用假的 ftplib.FTP 测试FTP连接池：每个主机的连接数上限、NOOP健康检查和关闭空闲连接"""
+import threading
+import time
+from ftplib import error_temp
+
+import pytest
+
+import ftp_pool
+from ftp_pool import FTPConnectionPool
+
+
+class FakeFTP:
+    """记录命令的假FTP连接；dead为True时NOOP失败（服务器已关闭空闲连接）"""
+    instances = []
+
+    def __init__(self, host, timeout=None):
+        self.host = host
+        self.commands = []
+        self.dead = False
+        self.closed = False
+        FakeFTP.instances.append(self)
+
+    def login(self, user, password):
+        self.commands.append(('LOGIN', user))
+
+    def voidcmd(self, command):
+        if command == 'NOOP' and self.dead:
+            raise error_temp('421 Timeout')
+        self.commands.append(command)
+
+    def quit(self):
+        if self.dead:
+            raise EOFError()
+        self.closed = True
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def fake_ftp(monkeypatch):
+    FakeFTP.instances = []
+    monkeypatch.setattr(ftp_pool, 'FTP', FakeFTP)
+
+
+def test_idle_connection_is_reused():
+    pool = FTPConnectionPool()
+    with pool.connection('ftp.example.com', 'user', 'pass') as first:
+        pass
+    with pool.connection('ftp.example.com', 'user', 'pass') as second:
+        pass
+    assert second is first
+    assert first.commands == [('LOGIN', 'user'), 'TYPE I', 'NOOP']
+    # 不同用户不共用连接
+    with pool.connection('ftp.example.com', 'other', 'pass') as third:
+        assert third is not first
+
+
+def test_connections_per_host_are_limited():
+    pool = FTPConnectionPool(max_per_host=2)
+    active = []
+    peak = []
+    lock = threading.Lock()
+
+    def worker():
+        with pool.connection('ftp.example.com', 'user', 'pass'):
+            with lock:
+                active.append(1)
+                peak.append(len(active))
+            time.sleep(0.05)
+            with lock:
+                active.pop()
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert max(peak) == 2
+    assert len(FakeFTP.instances) == 2
+
+    # 其他主机不受这个主机的上限影响
+    with pool.connection('ftp.example.com', 'user', 'pass'):
+        with pool.connection('ftp.example.com', 'user', 'pass'):
+            with pool.connection('mirror.example.com', 'user', 'pass') as other:
+                assert other.host == 'mirror.example.com'
+
+
+def test_dead_idle_connection_is_replaced():
+    pool = FTPConnectionPool()
+    with pool.connection('ftp.example.com', 'user', 'pass') as first:
+        pass
+    first.dead = True
+    with pool.connection('ftp.example.com', 'user', 'pass') as second:
+        assert second is not first
+    assert first.closed
+    assert len(FakeFTP.instances) == 2
+
+
+def test_connection_is_closed_after_error():
+    pool = FTPConnectionPool()
+    with pytest.raises(EOFError):
+        with pool.connection('ftp.example.com', 'user', 'pass') as broken:
+            raise EOFError()
+    assert broken.closed
+    with pool.connection('ftp.example.com', 'user', 'pass') as ftp:
+        assert ftp is not broken
+
+
+def test_close_all_closes_idle_connections():
+    pool = FTPConnectionPool()
+    with pool.connection('ftp.example.com', 'user', 'pass'):
+        with pool.connection('ftp.example.com', 'user', 'pass'):
+            pass
+    with pool.connection('mirror.example.com', 'user', 'pass'):
+        pass
+    assert len(FakeFTP.instances) == 3
+    pool.close_all()
+    assert all(ftp.closed for ftp in FakeFTP.instances)
+    with pool.connection('ftp.example.com', 'user', 'pass') as ftp:
+        assert ftp not in FakeFTP.instances[:3]
@@ -0,0 +1,38 @@
+# test_granule_catalog.py
+"""测试文件目录的增量扫描：只处理扫描目录下的记录，目录名中的 _ 和 % 不当作通配符"""
+import os
+
+import pytest
+
+from granule_catalog import GranuleCatalog
+
+
+@pytest.fixture
+def catalog(tmp_path):
+    catalog = GranuleCatalog(str(tmp_path / 'granule_catalog.sqlite'))
+    yield catalog
+    catalog.close()
+
+
+def _write(directory, name):
+    os.makedirs(directory, exist_ok=True)
+    with open(os.path.join(directory, name), 'wb') as f:
+        f.write(b'x')
+
+
+def test_rebuild_only_touches_the_scanned_directory(catalog, tmp_path):
+    _write(tmp_path / 'a_b', 'FY3D_MERSI_GBAL_L1_20251013_0500_1000M_MS.HDF')
+    _write(tmp_path / 'aXb', 'FY3D_MERSI_GBAL_L1_20251013_0505_1000M_MS.HDF')
+
+    assert catalog.rebuild(str(tmp_path / 'aXb')) == {'added': 1, 'unchanged': 0, 'removed': 0}
+    # a_b 按 LIKE 会匹配 aXb 下的文件并把它当作已删除
+    assert catalog.rebuild(str(tmp_path / 'a_b')) == {'added': 1, 'unchanged': 0, 'removed': 0}
+    assert catalog.rebuild(str(tmp_path / 'aXb')) == {'added': 0, 'unchanged': 1, 'removed': 0}
+
+
+def test_rebuild_removes_deleted_files(catalog, tmp_path):
+    directory = tmp_path / 'downloads'
+    _write(directory, 'FY3D_MERSI_GBAL_L1_20251013_0500_1000M_MS.HDF')
+    catalog.rebuild(str(directory))
+    os.remove(directory / 'FY3D_MERSI_GBAL_L1_20251013_0500_1000M_MS.HDF')
+    assert catalog.rebuild(str(directory)) == {'added': 0, 'unchanged': 0, 'removed': 1}
@@ -0,0 +1,81 @@
+# test_pipeline.py
+"""测试下载流水线：同一景的 GEO1K 和 1000M 配对后只处理一次，缺少另一半的文件不处理"""
+import os
+import struct
+
+from integrity import HDF5_SIGNATURE
+from pipeline import ProcessedSceneIndex, ProcessingPipeline
+
+SCENE = 'FY3D_MERSI_GBAL_20251013_0500'
+LOG_NAME = 'processed.log'
+
+
+def record_scene(files, scene):
+    """后处理函数（模块顶层，交给子进程执行）：把景名和产品追加到文件所在目录的记录文件中"""
+    directory = os.path.dirname(next(iter(files.values())))
+    with open(os.path.join(directory, LOG_NAME), 'a') as f:
+        f.write(f"{scene} {','.join(sorted(files))}\n")
+    return scene
+
+
+def _hdf5_file(directory, name):
+    """最小的HDF5文件头：版本2超级块，文件结束地址等于文件大小"""
+    size = 96
+    header = HDF5_SIGNATURE + bytes([2, 8, 8, 0]) + struct.pack('<QQQ', 0, 0xFFFFFFFFFFFFFFFF, size)
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as f:
+        f.write(header.ljust(size, b'\0'))
+    return path
+
+
+def _processed(directory):
+    path = os.path.join(directory, LOG_NAME)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return f.read().splitlines()
+
+
+def _run(directory, paths, scene_index=None):
+    with ProcessingPipeline(record_scene, max_workers=2, scene_index=scene_index) as pipeline:
+        for path in paths:
+            pipeline.put(path)
+    return pipeline.summary
+
+
+def test_pair_is_processed_once_and_single_file_is_held_back(tmp_path):
+    directory = str(tmp_path)
+    paths = [
+        _hdf5_file(directory, 'FY3D_MERSI_GBAL_L1_20251013_0500_GEO1K_MS.HDF'),
+        _hdf5_file(directory, 'FY3D_MERSI_GBAL_L1_20251013_0500_1000M_MS.HDF'),
+        _hdf5_file(directory, 'FY3D_MERSI_GBAL_L1_20251013_0505_1000M_MS.HDF'),  # 没有对应的GEO1K
+    ]
+    summary = _run(directory, paths)
+    assert _processed(directory) == [f'{SCENE} 1000M,GEO1K']
+    assert summary['verified'] == 3
+    assert summary['processed'] == 1
+    assert summary['unpaired'] == 1
+    assert summary['failed'] == 0
+
+
+def test_processed_scene_is_skipped_on_rerun(tmp_path):
+    directory = str(tmp_path)
+    paths = [_hdf5_file(directory, 'FY3D_MERSI_GBAL_L1_20251013_0500_1000M_MS.HDF'),
+             _hdf5_file(directory, 'FY3D_MERSI_GBAL_L1_20251013_0500_GEO1K_MS.HDF')]
+    state_file = str(tmp_path / 'state' / 'processed_scenes.sqlite')
+
+    assert _run(directory, paths, ProcessedSceneIndex(state_file))['processed'] == 1
+    summary = _run(directory, paths, ProcessedSceneIndex(state_file))
+    assert summary['processed'] == 0 and summary['skipped'] == 1
+    assert len(_processed(directory)) == 1
+
+
+def test_invalid_file_is_not_processed(tmp_path):
+    directory = str(tmp_path)
+    broken = os.path.join(directory, 'FY3D_MERSI_GBAL_L1_20251013_0500_GEO1K_MS.HDF')
+    with open(broken, 'wb') as f:
+        f.write(b'not an hdf5 file')
+    pair = _hdf5_file(directory, 'FY3D_MERSI_GBAL_L1_20251013_0500_1000M_MS.HDF')
+    summary = _run(directory, [broken, pair])
+    assert summary['invalid'] == 1 and summary['unpaired'] == 1
+    assert _processed(directory) == []
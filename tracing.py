@@ -0,0 +1,140 @@
+# tracing.py
+import functools
+import inspect
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+# 跟踪文件目录（在程序目录下，每次运行一个文件）
+TRACE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'traces')
+
+
+class Tracer:
+    """
+    记录浏览器流程中每一步的耗时，输出Chrome trace-event格式的时间线
+    生成的JSON可以用 chrome://tracing 或 https://ui.perfetto.dev 打开
+    事件类别（cat）：
+    - step:  流程步骤（登录、选择范围、提交订单等）
+    - action: 元素操作（查找、点击、输入、识别验证码）
+    - wait:  显式等待（WebDriverWait.until）
+    - sleep: 固定等待（time.sleep）
+    """
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.events = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._pid = os.getpid()
+
+    def _now_us(self):
+        """距跟踪开始的微秒数"""
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextmanager
+    def span(self, name, cat='step', **args):
+        """
+        记录一段耗时，with块内可以往返回的字典里补充参数（如重试次数）
+        用法：
+            with tracer.span('登录', retries=0) as span_args:
+                ...
+                span_args['retries'] += 1
+        """
+        if not self.enabled:
+            yield dict(args)
+            return
+        start = self._now_us()
+        span_args = dict(args)
+        try:
+            yield span_args
+        except Exception as e:
+            span_args['error'] = repr(e)
+            raise
+        finally:
+            event = {
+                'name': name, 'cat': cat, 'ph': 'X',
+                'ts': round(start, 1), 'dur': round(self._now_us() - start, 1),
+                'pid': self._pid, 'tid': threading.get_ident(),
+                'args': {k: v if isinstance(v, (int, float, bool, type(None))) else str(v)
+                         for k, v in span_args.items()},
+            }
+            with self._lock:
+                self.events.append(event)
+
+    def sleep(self, seconds, reason=''):
+        """代替time.sleep，把固定等待的时间记入时间线"""
+        with self.span('sleep', cat='sleep', seconds=seconds, reason=reason):
+            time.sleep(seconds)
+
+    def traced(self, name=None, cat='action', args=()):
+        """
+        方法装饰器：每次调用记录一个span
+        args: 要记入时间线的参数名（如 ('value', 'retry')），不要包含密码等敏感参数
+        递归重试时每次重试都是一个嵌套的span，retry参数即重试序号
+        """
+        def decorator(func):
+            signature = inspect.signature(func)
+            span_name = name or func.__name__
+
+            @functools.wraps(func)
+            def wrapper(*call_args, **call_kwargs):
+                if not self.enabled:
+                    return func(*call_args, **call_kwargs)
+                bound = signature.bind(*call_args, **call_kwargs)
+                bound.apply_defaults()
+                recorded = {arg: bound.arguments.get(arg) for arg in args}
+                with self.span(span_name, cat=cat, **recorded) as span_args:
+                    result = func(*call_args, **call_kwargs)
+                    span_args['ok'] = result is not None and result is not False
+                    return result
+            return wrapper
+        return decorator
+
+    def summary(self, events=None):
+        """按类别和名称汇总：{'by_cat': {cat: 毫秒}, 'by_name': {(cat, name): (次数, 毫秒)}}"""
+        by_cat = {}
+        by_name = {}
+        if events is None:
+            with self._lock:
+                events = list(self.events)
+        for event in events:
+            ms = event['dur'] / 1000
+            key = (event['cat'], event['name'])
+            count, total = by_name.get(key, (0, 0.0))
+            by_name[key] = (count + 1, total + ms)
+            by_cat[event['cat']] = by_cat.get(event['cat'], 0.0) + ms
+        return {'by_cat': by_cat, 'by_name': by_name}
+
+    def write(self, prefix, trace_dir=TRACE_DIR):
+        """
+        写出本次运行的时间线文件并在日志中输出耗时最多的步骤，返回文件路径
+        写出后清空已记录的事件，同一进程中的下一次运行（如合并模式的下一阶段）单独成文件
+        """
+        if not self.enabled or not self.events:
+            return None
+        os.makedirs(trace_dir, exist_ok=True)
+        path = os.path.join(trace_dir, f"{prefix}_{datetime.now():%Y%m%d_%H%M%S}.json")
+        with self._lock:
+            events = sorted(self.events, key=lambda e: e['ts'])
+            self.events = []
+        metadata = [{'name': 'process_name', 'ph': 'M', 'pid': self._pid, 'args': {'name': prefix}}]
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': metadata + events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+        summary = self.summary(events)
+        # step/action 会嵌套包含等待，这里只汇总两类纯等待时间
+        logger.info(f"时间线已保存: {path}（显式等待{summary['by_cat'].get('wait', 0) / 1000:.1f}秒，"
+                    f"固定等待{summary['by_cat'].get('sleep', 0) / 1000:.1f}秒）")
+        slowest = sorted(summary['by_name'].items(), key=lambda item: item[1][1], reverse=True)[:10]
+        for (cat, name), (count, total) in slowest:
+            logger.info(f"  [{cat}] {name}: {count}次，共{total / 1000:.2f}秒")
+        return path
+
+
+# 浏览器流程共用的跟踪器（装饰器在类定义时绑定到它）
+tracer = Tracer()
@@ -0,0 +1,172 @@
+# transfer_metrics.py
+import json
+import logging
+import math
+import os
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+METRICS_JSONL = 'transfer_metrics.jsonl'   # 每个文件一行 + 每次运行一行汇总
+METRICS_PROM = 'transfer_metrics.prom'     # Prometheus textfile collector 格式
+
+
+class TransferStats:
+    """单个文件的传输指标：字节数、耗时、首字节时间、吞吐、重试次数、续传起点"""
+    def __init__(self, url, protocol):
+        self.url = url
+        self.protocol = protocol
+        self.filename = os.path.basename(url.split('?')[0])
+        self.bytes = 0               # 本次运行实际传输的字节数（不含续传前已有的部分）
+        self.wall_time = 0.0         # 总耗时（秒）
+        self.ttfb = None             # 开始到收到第一个数据块的时间（秒）
+        self.retries = 0
+        self.resume_offset = 0       # 续传起点（字节）
+        self.skipped = False         # 本地已完整，未传输
+        self.success = False
+        self.error = None
+        self._start = None
+        self._lock = threading.Lock()  # 分段下载时多个线程同时累加
+
+    def start(self):
+        """开始计时"""
+        self._start = time.perf_counter()
+
+    def add_bytes(self, size):
+        """记录收到的数据（第一次调用时记录首字节时间）"""
+        with self._lock:
+            if self.ttfb is None and self._start is not None:
+                self.ttfb = time.perf_counter() - self._start
+            self.bytes += size
+
+    def finish(self, success, error=None):
+        """结束计时"""
+        if self._start is not None:
+            self.wall_time = time.perf_counter() - self._start
+        self.success = success
+        self.error = error
+
+    @property
+    def throughput_mbps(self):
+        """吞吐量（MB/s）"""
+        if self.wall_time <= 0 or self.bytes == 0:
+            return 0.0
+        return self.bytes / self.wall_time / (1024 * 1024)
+
+    def to_dict(self):
+        return {
+            'type': 'file',
+            'filename': self.filename,
+            'protocol': self.protocol,
+            'success': self.success,
+            'skipped': self.skipped,
+            'bytes': self.bytes,
+            'wall_time': round(self.wall_time, 3),
+            'ttfb': round(self.ttfb, 3) if self.ttfb is not None else None,
+            'throughput_mbps': round(self.throughput_mbps, 3),
+            'retries': self.retries,
+            'resume_offset': self.resume_offset,
+            'error': self.error,
+        }
+
+
+def _percentile(values, percent):
+    """最近秩法求百分位数"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(percent / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+class MetricsCollector:
+    """汇总一次运行的所有文件指标，输出JSON lines和Prometheus textfile"""
+    def __init__(self, output_dir):
+        self.output_dir = output_dir
+        self.started_at = datetime.now()
+        self._start = time.perf_counter()
+        self.stats = []
+
+    def add(self, stats):
+        self.stats.append(stats)
+
+    def summary(self):
+        """本次运行的汇总指标"""
+        transferred = [s for s in self.stats if s.success and not s.skipped and s.bytes > 0]
+        throughputs = [s.throughput_mbps for s in transferred]
+        total_bytes = sum(s.bytes for s in self.stats)
+        wall_time = time.perf_counter() - self._start
+        return {
+            'type': 'run',
+            'started_at': self.started_at.isoformat(timespec='seconds'),
+            'files': len(self.stats),
+            'success': sum(1 for s in self.stats if s.success),
+            'failed': sum(1 for s in self.stats if not s.success),
+            'skipped': sum(1 for s in self.stats if s.skipped),
+            'retries': sum(s.retries for s in self.stats),
+            'bytes': total_bytes,
+            'wall_time': round(wall_time, 3),
+            'throughput_mbps': round(total_bytes / wall_time / (1024 * 1024), 3) if wall_time > 0 else 0.0,
+            'file_throughput_p50_mbps': round(_percentile(throughputs, 50), 3),
+            'file_throughput_p95_mbps': round(_percentile(throughputs, 95), 3),
+        }
+
+    def write(self):
+        """追加写入JSON lines文件，并重写Prometheus textfile"""
+        os.makedirs(self.output_dir, exist_ok=True)
+        summary = self.summary()
+        run_id = summary['started_at']
+
+        jsonl_path = os.path.join(self.output_dir, METRICS_JSONL)
+        with open(jsonl_path, 'a', encoding='utf-8') as f:
+            for stats in self.stats:
+                record = stats.to_dict()
+                record['run'] = run_id
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.write(json.dumps(summary, ensure_ascii=False) + '\n')
+
+        # 先写临时文件再重命名，避免node_exporter读到写了一半的文件
+        prom_path = os.path.join(self.output_dir, METRICS_PROM)
+        with open(prom_path + '.tmp', 'w', encoding='utf-8') as f:
+            f.write(self._prometheus_text(summary))
+        os.replace(prom_path + '.tmp', prom_path)
+
+        logger.info(f"传输指标: {summary['success']}/{summary['files']}个文件成功，"
+                    f"{summary['bytes'] / (1024 * 1024):.1f}MB，用时{summary['wall_time']:.1f}秒，"
+                    f"单文件吞吐 p50={summary['file_throughput_p50_mbps']}MB/s p95={summary['file_throughput_p95_mbps']}MB/s")
+        return summary
+
+    def _prometheus_text(self, summary):
+        """生成Prometheus textfile内容"""
+        lines = []
+
+        def metric(name, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{v}"' for k, v in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        metric('fy_download_last_run_timestamp_seconds', 'Start time of the last download run.',
+               [({}, int(self.started_at.timestamp()))])
+        metric('fy_download_files', 'Files handled in the last run by status.',
+               [({'status': 'success'}, summary['success']),
+                ({'status': 'failed'}, summary['failed']),
+                ({'status': 'skipped'}, summary['skipped'])])
+        metric('fy_download_bytes', 'Bytes transferred in the last run by protocol.',
+               [({'protocol': p}, sum(s.bytes for s in self.stats if s.protocol == p))
+                for p in sorted({s.protocol for s in self.stats})])
+        metric('fy_download_retries', 'Transfer retries in the last run.', [({}, summary['retries'])])
+        metric('fy_download_duration_seconds', 'Wall time of the last run.', [({}, summary['wall_time'])])
+        metric('fy_download_throughput_mbps', 'Aggregate throughput of the last run in MB/s.',
+               [({}, summary['throughput_mbps'])])
+        metric('fy_download_file_throughput_mbps', 'Per-file throughput quantiles of the last run in MB/s.',
+               [({'quantile': '0.5'}, summary['file_throughput_p50_mbps']),
+                ({'quantile': '0.95'}, summary['file_throughput_p95_mbps'])])
+        ttfbs = [s.ttfb for s in self.stats if s.ttfb is not None]
+        metric('fy_download_ttfb_seconds', 'Per-file time-to-first-byte quantiles of the last run.',
+               [({'quantile': '0.5'}, round(_percentile(ttfbs, 50), 3)),
+                ({'quantile': '0.95'}, round(_percentile(ttfbs, 95), 3))])
+        return '\n'.join(lines) + '\n'